@@ -5,7 +5,10 @@
 ##################
 # Import anything you need, like math.
 
-from sutd_vn_engine.engine import Controller, run_story
+from sutd_vn_engine.engine import Controller, run_headless, run_story
+from sutd_vn_engine.engine.autoplay import VirtualClock
+from sutd_vn_engine.engine.record import Recorder, Replayer
+from sutd_vn_engine.engine.script import Interpreter, load_script
 from sutd_vn_engine.scenarios import *
 
 
@@ -86,4 +89,62 @@ def story(G: Controller):
 
 
 if __name__ == "__main__":
-    run_story(story)
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(prog="python -m sutd_vn_engine")
+    parser.add_argument(
+        "--headless", action="store_true", help="run in the terminal without a GUI"
+    )
+    parser.add_argument(
+        "--inputs", help="file of replies to prompts, one per line (with --headless)"
+    )
+    parser.add_argument("--script", help="run a story script instead of `story()`")
+    parser.add_argument(
+        "--save",
+        help="save file for --script, resumed from if it exists & saved to before"
+        " every prompt",
+    )
+    parser.add_argument("--record", help="record session to file")
+    parser.add_argument("--replay", help="reply to prompts from a recorded session")
+    parser.add_argument(
+        "--realtime",
+        action="store_true",
+        help="replay replies at their recorded times (with --replay)",
+    )
+    args = parser.parse_args()
+
+    if args.script:
+        program = load_script(args.script)
+
+        def story(G: Controller):
+            """Storyline from script. Replying "/back" goes back one prompt."""
+            interp = Interpreter(G, program, autosave=args.save, undo_reply="/back")
+            if args.save and os.path.exists(args.save):
+                interp.load(args.save)
+            interp.run()
+
+    recorder = Recorder(args.record) if args.record else None
+    replayer = Replayer(args.replay, args.realtime) if args.replay else None
+    if recorder or replayer:
+        unwrapped_story = story
+
+        def story(G: Controller):
+            """Storyline with session recorded and/or replayed."""
+            # Headless runs take replies from `replayer` directly.
+            if replayer and not args.headless:
+                G = replayer.wrap(G)
+            if recorder:
+                G = recorder.wrap(G)
+            unwrapped_story(G)
+
+    if args.headless:
+        replies = replayer
+        if args.inputs:
+            with open(args.inputs, encoding="utf-8") as f:
+                replies = f.read().splitlines()
+        clock = VirtualClock()
+        run_headless(story, replies, clock=clock)
+        print(f"Playthrough time on auto-play: {clock.now / 60:.1f} min")
+    else:
+        run_story(story)
@@ -1,3 +1,4 @@
 """Engine code."""
 
 from .app import *
+from .headless import *
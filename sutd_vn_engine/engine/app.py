@@ -1,8 +1,9 @@
 """Underlying engine for VN game."""
 
 import asyncio
+import functools
+import inspect
 import logging
-import random
 import time
 
 # https://docs.python.org/3/library/tk.html
@@ -10,19 +11,57 @@ import time
 import tkinter as tk
 import tkinter.font as tkFont
 import tkinter.ttk as ttk
+from collections import deque
 from concurrent import futures
 from contextlib import asynccontextmanager
-from typing import Any, Callable, Dict, NamedTuple
-
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from .autoplay import AutoPlay
+from .background import set_canvas_bg
 from .chat import ChatLog
-from .image import Image
-from .utils import ASSETS_DIR, EM, LOOP_WAIT, bind_toggle, set_canvas_bg, wait_coro
+from .commands import CommandQueue
+from .effects import Jumpscare
+from .image import IMAGE_CACHE, Image
+from .pump import get_pump, new_event_loop
+from .seen import SeenIndex
+from .utils import ASSETS_DIR, EM, bind_toggle, wait_coro
 from .windowing import create_window
 
-__all__ = ["Controller", "create_app", "run_story"]
+__all__ = [
+    "AsyncController",
+    "AsyncStory",
+    "Controller",
+    "create_app",
+    "create_sync_controller",
+    "run_story",
+]
 
 log = logging.getLogger(__name__)
 
+STARTED = time.perf_counter()
+"""When the engine was imported, which startup is timed from."""
+
+FACE_ATLAS = (
+    "background",
+    "face_sparkly",
+    "face_interested",
+    "face_obsessed1",
+    "face_eldritch",
+    "face_obsessed2",
+    "face_jumpscare",
+)
+"""Face cam & jumpscare assets, packed into one atlas loaded at startup."""
+
 
 class Controller(NamedTuple):
     """Contains all key functions for controlling the GUI as one singleton."""
@@ -43,45 +82,112 @@ class Controller(NamedTuple):
     """Function to set background image."""
     show_jumpscare: Callable
     """Function to show jumpscare."""
+    enter: Optional[Callable[..., None]] = None
+    """Function to type a reply into the GUI for the next `input()` prompt, if any.
+    See `create_input_function()`."""
+
+
+class AsyncController(NamedTuple):
+    """`Controller` for `async def` stories running on the main thread event loop.
+
+    `input()`, `print()` and `show_jumpscare()` are coroutines that must be awaited.
+    The rest are plain functions that change the GUI immediately.
+    """
+
+    root: tk.Tk
+    """Root Tkinter widget."""
+    flags_dict: Dict[str, Any]
+    """Dictionary for storing arbitrary game flags."""
+    input: Callable[[object], Awaitable[str]]
+    """Coroutine function to emulate `input()`."""
+    print: Callable[..., Awaitable[None]]
+    """Coroutine function to emulate `print()`."""
+    set_speaker: Callable
+    """Function to set name & position of subsequent chat bubbles."""
+    show_face: Callable[[str], None]
+    """Function to set webcam window image."""
+    show_bg: Callable[[str], None]
+    """Function to set background image."""
+    show_jumpscare: Callable[[], Awaitable[None]]
+    """Coroutine function to show jumpscare."""
+    enter: Optional[Callable[..., None]] = None
+    """Function to type a reply into the GUI for the next `input()` prompt, if any.
+    See `create_input_function()`."""
+
+
+AsyncStory = Callable[[AsyncController], Awaitable[Any]]
+"""`async def` story function."""
 
 
 def create_input_function(
-    loop: asyncio.AbstractEventLoop, chatlog: ChatLog, inputbox: tk.Entry
+    chatlog: ChatLog, inputbox: tk.Entry, auto: Optional[AutoPlay] = None
 ):
     """Emulates standard `input()` function using widgets.
 
-    Input is triggered by pressing the Enter key inside `inputbox`.
+    Input is triggered by pressing the Enter key inside `inputbox`. Replies can also
+    be typed by code with the returned `enter(text, delay=0.0)` function, which
+    fills `inputbox` & presses Enter once the next prompt is shown, but no sooner
+    than `delay` seconds from now, e.g. to replay a session through the GUI.
 
     Args:
-        loop (asyncio.AbstractEventLoop): Main thread event loop.
         chatlog (ChatLog): ChatLog widget to print to.
         inputbox (tk.Entry): Entry widget for input.
+        auto (Optional[AutoPlay], optional): Auto-play pacer to wait for before
+            showing prompt. Defaults to None.
 
     Returns:
-        Callable[[object], str]: Emulated `input()` function.
+        Tuple[Callable[[object], Awaitable[str]], Callable[..., None]]: Emulated
+            `input()` coroutine function, function to type a reply.
     """
-    # Whether input is triggered.
-    triggered = False
+    # Future resolved when input is submitted, while `input()` is pending.
+    submitted: Optional[asyncio.Future] = None
+    # (Reply, loop time to type it at) of replies to type at upcoming prompts.
+    typed: Deque[Tuple[str, float]] = deque()
 
     def _trigger(_):
         """Callback to trigger input."""
-        nonlocal triggered
-        triggered = True
+        if submitted is not None and not submitted.done():
+            submitted.set_result(None)
+
+    def _type():
+        """Type the next queued reply if a prompt is pending & it is due."""
+        if submitted is None or submitted.done() or not typed:
+            return
+        reply, due = typed[0]
+        loop = asyncio.get_running_loop()
+        if due > loop.time():
+            loop.call_at(due, _type)
+            return
+        typed.popleft()
+        inputbox.delete("0", "end")
+        inputbox.insert("0", reply)
+        _trigger(None)
+
+    def _enter(text: str, delay: float = 0.0):
+        """Type `text` at the next prompt, no sooner than `delay` seconds from now."""
+        typed.append((text, asyncio.get_running_loop().time() + delay))
+        _type()
 
     async def _input(__prompt: object = "", /):
         """Emulates `input()`."""
-        nonlocal triggered
+        nonlocal submitted
 
         # Display prompt & enable input.
         text = str(__prompt)
+        if auto is not None:
+            await auto.wait()
+        get_pump(inputbox).wake()
         inputbox.config(state="normal")
         chatlog.add_msg(text, name="", side="center")
         logging.info(f"Wait prompt: {text}")
 
         # Block till input.
-        while not triggered:
-            await asyncio.sleep(LOOP_WAIT)
-        triggered = False
+        submitted = asyncio.get_running_loop().create_future()
+        _type()
+        try:
+            await submitted
+        finally:
+            submitted = None
 
         # Retrieve input.
         reply = inputbox.get()
@@ -90,149 +196,189 @@ def create_input_function(
         logging.info(f"Prompt: {text}, Return: {reply}")
         return reply
 
-    def _ginput(*args, **kwargs):
-        """Synchronous wrapper for `input()`."""
-        return wait_coro(_input(*args, **kwargs), loop)
-
     # Disable input until `input()` is called.
     inputbox.config(state="disabled")
     inputbox.bind("<Return>", _trigger)
     logging.info("Input function binded.")
-    return _ginput
+    return _input, _enter
 
 
-def create_print_function(loop: asyncio.AbstractEventLoop, chatlog: ChatLog):
+def create_print_function(
+    chatlog: ChatLog,
+    seen: Optional[SeenIndex] = None,
+    auto: Optional[AutoPlay] = None,
+):
     """Emulates print function using GUI elements.
 
-    By default, print is animated. To skip animation, `skipvar.set(True)`.
+    By default, print is animated. To skip animation, `skipvar.set(True)`. To skip
+    animation of only lines seen in earlier playthroughs, `skipreadvar.set(True)`.
 
     Args:
-        loop (asyncio.AbstractEventLoop): Main thread event loop.
         chatlog (ChatLog): ChatLog widget to print to.
+        seen (Optional[SeenIndex], optional): Index of seen lines, updated with
+            every line printed. Defaults to None to treat all lines as unseen.
+        auto (Optional[AutoPlay], optional): Auto-play pacer to wait for before
+            each line, and to schedule after it. Defaults to None.
 
     Returns:
-        Tuple[Callable[..., None], tk.BooleanVar]: Emulated `print()` function,
-            BooleanVar that can be set to skip animation.
+        Tuple[Callable[..., Awaitable[None]], tk.BooleanVar, tk.BooleanVar]:
+            Emulated `print()` coroutine function, BooleanVar that can be set to
+            skip animation, BooleanVar that can be set to skip seen lines.
     """
     skipvar = tk.BooleanVar(chatlog)
+    skipreadvar = tk.BooleanVar(chatlog)
+    # Mirrors `skipvar` so animations can await skipping instead of polling it.
+    skipped = asyncio.Event()
+    first = True
+
+    def _on_skip(*_):
+        """Update `skipped` when `skipvar` is changed."""
+        if skipvar.get():
+            skipped.set()
+            if auto is not None:
+                auto.advance()
+        else:
+            skipped.clear()
 
     async def _print(*values, sep=" "):
         """Emulates `print()`."""
+        nonlocal first
         text = sep.join(map(str, values))
         logging.info(f"Print: {text}")
+        if auto is not None and not skipped.is_set():
+            await auto.wait()
+        get_pump(chatlog).wake()
+        if first:
+            first = False
+            dt = (time.perf_counter() - STARTED) * 1e3
+            log.info(f"Time to first text: {dt:.0f} ms")
+        was_seen = seen is not None and seen.add(chatlog.name, text)
 
-        # Whether animation is in progress.
-        running = True
-
-        async def _check_cancel():
-            """Task that completes immediately when animation is skipped."""
-            while running and not skipvar.get():
-                await asyncio.sleep(LOOP_WAIT)
-
-        async def _print_coro():
-            """Animation task."""
-            nonlocal running
-            try:
-                await chatlog.add_anim_msg(text)
-            except tk.TclError:
-                log.warning("App exited during print animation.")
-            running = False
-
-        task_cancel = asyncio.create_task(_check_cancel())
-        task_print = asyncio.create_task(_print_coro())
-
-        # To cancel anim early, race for `task_cancel` to complete first.
-        await asyncio.wait(
-            [task_cancel, task_print], return_when=asyncio.FIRST_COMPLETED
-        )
-        if running:
+        try:
+            if skipped.is_set() or (was_seen and skipreadvar.get()):
+                chatlog.add_msg(text)
+                return
+
+            task_print = asyncio.create_task(chatlog.add_anim_msg(text))
+            task_skip = asyncio.create_task(skipped.wait())
+
+            # To cancel anim early, race for `task_skip` to complete first.
+            await asyncio.wait(
+                [task_skip, task_print], return_when=asyncio.FIRST_COMPLETED
+            )
+            task_skip.cancel()
             task_print.cancel()
-        await asyncio.gather(task_cancel, task_print)
+            await task_print
+            if auto is not None and not skipped.is_set():
+                auto.schedule(text)
+        except tk.TclError:
+            log.warning("App exited during print animation.")
 
-    def _gprint(*args, **kwargs):
-        """Synchronous wrapper for `print()`."""
-        return wait_coro(_print(*args, **kwargs), loop)
+    skipvar.trace_add("write", _on_skip)
+    return _print, skipvar, skipreadvar
 
-    return _gprint, skipvar
 
+def create_face_function(face_img: Image):
+    """Function to set webcam window image.
 
-def create_face_function(loop: asyncio.AbstractEventLoop, face_img: Image):
-    """Function to set webcam window image."""
+    The image is swapped once it is decoded in the background, so frames keep being
+    drawn meanwhile. If faces are set in quick succession, only the latest is shown.
+    """
+    latest = None
 
-    # NOTE: I had to use async here to schedule the function on the main GUI thread.
-    async def _show_face(img_name: str):
+    def _show_face(img_name: str):
         """Set webcam window image."""
-        face_img.change_img(f"{ASSETS_DIR}/{img_name}.png")
+        nonlocal latest
+        img_fp = latest = f"{ASSETS_DIR}/{img_name}.png"
 
-    def _gshow_face(img_name: str):
-        """Synchronous wrapper for `show_face()`."""
-        # NOTE: Had to be done to schedule image change on main GUI thread.
-        return wait_coro(_show_face(img_name), loop)
+        def _swap():
+            """Show image unless another face was set since."""
+            if img_fp != latest:
+                return
+            try:
+                face_img.change_img(img_fp)
+                get_pump(face_img).wake()
+            except tk.TclError:
+                log.warning("App exited before face was shown.")
 
-    return _gshow_face
+        face_img.cache.when_ready(img_fp, _swap)
 
+    return _show_face
 
-def create_bg_function(loop: asyncio.AbstractEventLoop, canvas: tk.Canvas):
-    """Function to set background image."""
 
-    async def _show_bg(img_name: str):
-        """Set background image."""
-        set_canvas_bg(canvas, f"{ASSETS_DIR}/{img_name}.png")
+def create_bg_function(canvas: tk.Canvas):
+    """Function to set background image, once it is decoded in the background."""
 
-    def _gshow_bg(img_name: str):
-        """Synchronous wrapper for `show_bg()`."""
-        # NOTE: Had to be done to schedule image change on main GUI thread.
-        return wait_coro(_show_bg(img_name), loop)
+    def _show_bg(img_name: str):
+        """Set background image."""
+        set_canvas_bg(canvas, f"{ASSETS_DIR}/{img_name}.png", layer="story")
 
-    return _gshow_bg
+    return _show_bg
 
 
-def create_jumpscare_function(loop: asyncio.AbstractEventLoop, canvas: tk.Canvas):
+def create_jumpscare_function(canvas: tk.Canvas):
     """Function to jumpscare."""
 
     async def _show_jumpscare():
-        """Set background image."""
-        memory_leak = []
-        max_windows = 69
-        window_chance = 1.0
-        window_spawn_time = 1.0
-
-        start_time = time.time()
-        while True:
-            set_canvas_bg(canvas, f"{ASSETS_DIR}/face_eldritch.png")
-            await asyncio.sleep(0.02)
-            set_canvas_bg(canvas, f"{ASSETS_DIR}/face_obsessed2.png")
-            await asyncio.sleep(0.001)
-
-            if time.time() - start_time < window_spawn_time:
-                continue
-
-            if random.random() < window_chance:
-                x, y = (
-                    random.randint(0, canvas.winfo_width()),
-                    random.randint(0, canvas.winfo_height()),
-                )
-                win = create_window(
-                    canvas,
-                    f"HELLO{max_windows-len(memory_leak)}",
-                    (x, y, 400, 400),
-                    enable_close=True,
-                    disable_resize=True,
-                )
-                img = Image(win, img_fp=f"{ASSETS_DIR}/face_jumpscare.png")
-                img.pack(fill="both", expand=True)
-                memory_leak.append((img, win))
-
-            if len(memory_leak) > max_windows:
-                break
+        """Play jumpscare, then quit."""
+        await Jumpscare(canvas).play()
         raise KeyboardInterrupt
 
-    def _gshow_jumpscare():
-        """Synchronous wrapper for `show_jumpscare()`."""
-        # NOTE: Had to be done to schedule image change on main GUI thread.
-        return wait_coro(_show_jumpscare(), loop)
+    return _show_jumpscare
+
+
+def create_sync_controller(A: AsyncController, loop: asyncio.AbstractEventLoop):
+    """Wrap `AsyncController` as a `Controller` for stories in a "game thread".
+
+    Coroutines are run on `loop` while the "game thread" waits for them. Plain
+    functions are queued on a `CommandQueue` and applied once per frame without
+    waiting, with the queue flushed before each coroutine so calls stay in order.
 
-    return _gshow_jumpscare
+    Args:
+        A (AsyncController): Controller to wrap.
+        loop (asyncio.AbstractEventLoop): Main thread event loop.
+
+    Returns:
+        Controller: Synchronous controller.
+    """
+    commands = CommandQueue(loop, get_pump(A.root))
+
+    def _blocking(fn: Callable[..., Awaitable]):
+        """Synchronous wrapper for coroutine function `fn`."""
+
+        async def _call(*args, **kwargs):
+            """Apply queued calls, then call `fn`."""
+            commands.flush()
+            return await fn(*args, **kwargs)
+
+        @functools.wraps(fn)
+        def _wrapper(*args, **kwargs):
+            """Wait for `fn` on `loop`."""
+            return wait_coro(_call(*args, **kwargs), loop)
+
+        return _wrapper
+
+    def _queued(fn: Callable):
+        """Wrapper that queues `fn` on main GUI thread without waiting for it."""
+
+        @functools.wraps(fn)
+        def _wrapper(*args, **kwargs):
+            """Queue `fn`."""
+            commands.put(fn, *args, **kwargs)
+
+        return _wrapper
+
+    return Controller(
+        root=A.root,
+        flags_dict=A.flags_dict,
+        input=_blocking(A.input),
+        print=_blocking(A.print),
+        set_speaker=_queued(A.set_speaker),
+        show_face=_queued(A.show_face),
+        show_bg=_queued(A.show_bg),
+        show_jumpscare=_blocking(A.show_jumpscare),
+        enter=None if A.enter is None else _queued(A.enter),
+    )
 
 
 def init_taskbar(root: tk.Misc):
@@ -262,29 +408,33 @@ def init_taskbar(root: tk.Misc):
     return taskbar
 
 
-def init_chat_win(canvas: tk.Canvas, loop: asyncio.AbstractEventLoop):
+def init_chat_win(canvas: tk.Canvas):
     """Create chat window inside `canvas`.
 
-    The asyncio event `loop` is expected to be on the main thread due to Tkinter
-    limitations. As such, the emulated `input()` and `print()` functions should
-    be called from a separate "game thread" to prevent deadlock. `loop` is used
-    to call `input()` and `print()`, which are coroutines, synchronously within
-    the "game thread".
+    The emulated `input()` and `print()` functions are coroutines that must run on
+    the main thread event loop due to Tkinter limitations. See
+    `create_sync_controller()` to call them from a separate "game thread".
 
     Args:
         canvas (tk.Canvas): Canvas to create chat window in.
-        loop (asyncio.AbstractEventLoop): Main thread event loop.
 
     Returns:
-        Tuple[ChatLog, Callable[[object], str], Callable[..., None]]:
-            ChatLog widget, emulated `input()` function, emulated `print()` function.
+        Tuple[ChatLog, Callable[[object], Awaitable[str]], Callable[..., Awaitable],
+            Callable[..., None]]: ChatLog widget, emulated `input()` function,
+            emulated `print()` function, function to type a reply.
     """
     # Create widgets.
-    bbox = (canvas.winfo_width() // 2 - 30 * EM[0], 5 * EM[0], 70 * EM[0], 70 * EM[0])
+    # Canvas has no size until it is first laid out, but fills the screen.
+    width = canvas.winfo_width()
+    if width <= 1:
+        width = canvas.winfo_screenwidth()
+    bbox = (width // 2 - 30 * EM[0], 5 * EM[0], 70 * EM[0], 70 * EM[0])
     chat_win = create_window(canvas, "Bubble", bbox)
     chatlog = ChatLog(chat_win)
     textbox = ttk.Entry(chat_win)
     skipbtn = tk.Button(chat_win, text="Skip")
+    skipreadbtn = tk.Button(chat_win, text="Skip Read")
+    autobtn = tk.Button(chat_win, text="Auto")
 
     # Configure grid layout.
     chat_win.rowconfigure(11, minsize=EM[0])
@@ -294,26 +444,62 @@ def init_chat_win(canvas: tk.Canvas, loop: asyncio.AbstractEventLoop):
     # Place widgets.
     chatlog.grid(sticky="nsew", row=0, columnspan=12, rowspan=11)
     skipbtn.grid(sticky="nsew", row=11, column=0, columnspan=2)
-    textbox.grid(sticky="nsew", row=11, column=2, columnspan=10)
+    skipreadbtn.grid(sticky="nsew", row=11, column=2, columnspan=2)
+    autobtn.grid(sticky="nsew", row=11, column=4, columnspan=2)
+    textbox.grid(sticky="nsew", row=11, column=6, columnspan=6)
 
     # Create emulated `input()` and `print()` functions.
-    _input = create_input_function(loop, chatlog, textbox)
-    _print, skipvar = create_print_function(loop, chatlog)
+    auto = AutoPlay()
+    autovar = tk.BooleanVar(chat_win, auto.enabled)
+    autovar.trace_add("write", lambda *_: auto.set_enabled(autovar.get()))
+    _input, _enter = create_input_function(chatlog, textbox, auto)
+    _print, skipvar, skipreadvar = create_print_function(chatlog, SeenIndex(), auto)
 
     bind_toggle(skipbtn, skipvar, "Skipping", "Skip")
-    return chatlog, _input, _print
+    bind_toggle(skipreadbtn, skipreadvar, "Skipping Read", "Skip Read")
+    bind_toggle(autobtn, autovar, "Auto On", "Auto")
+    return chatlog, _input, _print, _enter
 
 
-def init_gui(loop: asyncio.AbstractEventLoop):
-    """Creates GUI and `Controller` singleton.
+def init_desktop(root: tk.Misc, canvas: tk.Canvas):
+    """Add the purely decorative desktop background, icons & taskbar.
 
-    Asyncio event `loop` is required for `init_chat_win()`. See `init_chat_win()`
+    The images are decoded in the background & drawn below all other canvas items,
+    so this can be called after the story has started.
+    """
+    desktop = set_canvas_bg(
+        canvas, f"{ASSETS_DIR}/windoes_background.png", layer="desktop"
+    )
+    icons = set_canvas_bg(
+        canvas,
+        f"{ASSETS_DIR}/desktop_icons.png",
+        xratio=0.02,
+        yratio=0.02,
+        resize=False,
+        anchor="nw",
+        layer="icons",
+    )
+    # The story may have shown a background already.
+    canvas.tag_lower(icons.item)
+    canvas.tag_lower(desktop.item)
+
+    taskbar = init_taskbar(root)
+    taskbar.pack(fill="x", side="bottom", before=canvas)
+
+
+def init_gui():
+    """Creates GUI and `AsyncController` singleton.
+
+    Only the chat & webcam windows are created up front, without waiting for them
+    to be laid out or for any image to decode. The desktop is added by
+    `init_desktop()` once the first frame is drawn.
+
+    Must be called from within the main thread event loop. See `init_chat_win()`
     for more details.
     """
     root = tk.Tk()
     root.title("SUTD VN")
     root.attributes("-fullscreen", True)
-    root.update_idletasks()
 
     # NOTE: Dirty hack to change global scale.
     # root.tk.call("tk", "scaling", 2.0) # Doesn't work.
@@ -334,40 +520,38 @@ def init_gui(loop: asyncio.AbstractEventLoop):
 
     # Canvas that serves as "desktop".
     canvas = tk.Canvas(root, bg="#e28de2")
-    set_canvas_bg(canvas, f"{ASSETS_DIR}/windoes_background.png")
-    set_canvas_bg(
-        canvas,
-        f"{ASSETS_DIR}/desktop_icons.png",
-        xratio=0.02,
-        yratio=0.02,
-        resize=False,
-        anchor="nw",
-    )
-
-    taskbar = init_taskbar(root)
-
     canvas.pack(fill="both", side="top", expand=True)
-    taskbar.pack(fill="x", side="bottom")
 
-    # Run one update loop to update widget sizes for subsequent relative widget
-    # placements to work.
-    root.update()
-
-    chatlog, _ginput, _gprint = init_chat_win(canvas, loop)
+    chatlog, _input, _print, _enter = init_chat_win(canvas)
     webcam_bbox = (2 * EM[0], 2 * EM[0], 400, 400)
     webcam = create_window(canvas, "Face Cam", webcam_bbox, disable_resize=True)
-    face_img = Image(webcam, img_fp=f"{ASSETS_DIR}/sutd.png")
+    face_img = Image(webcam)
     face_img.pack(fill="both", expand=True)
 
-    _G = Controller(
+    # Decode images in worker threads, the webcam image first, then the faces.
+    show_face = create_face_function(face_img)
+    show_face("sutd")
+    IMAGE_CACHE.use_atlas("faces", *(f"{ASSETS_DIR}/{name}.png" for name in FACE_ATLAS))
+
+    def _on_first_frame(_):
+        """Add desktop once the chat window is first drawn."""
+        root.unbind("<Expose>", funcid)
+        dt = (time.perf_counter() - STARTED) * 1e3
+        log.info(f"Time to first frame: {dt:.0f} ms")
+        init_desktop(root, canvas)
+
+    funcid = root.bind("<Expose>", _on_first_frame)
+
+    _G = AsyncController(
         root=root,
         flags_dict={},
-        input=_ginput,
-        print=_gprint,
+        input=_input,
+        print=_print,
         set_speaker=chatlog.set_speaker,
-        show_face=create_face_function(loop, face_img),
-        show_bg=create_bg_function(loop, canvas),
-        show_jumpscare=create_jumpscare_function(loop, canvas),
+        show_face=show_face,
+        show_bg=create_bg_function(canvas),
+        show_jumpscare=create_jumpscare_function(canvas),
+        enter=_enter,
     )
     logging.info("GUI initialized.")
     return _G
@@ -375,8 +559,13 @@ def init_gui(loop: asyncio.AbstractEventLoop):
 
 @asynccontextmanager
 async def create_app():
-    """Init & run app, then clean up when exiting."""
-    _G = init_gui(asyncio.get_running_loop())
+    """Init & run app, then clean up when exiting.
+
+    Yields:
+        AsyncController: Controller of the app.
+    """
+    _G = init_gui()
+    pump = get_pump(_G.root)
 
     # Whether app should continue running.
     running = True
@@ -384,10 +573,8 @@ async def create_app():
     async def _loop():
         """Tkinter GUI update loop task."""
         logging.info("GUI loop started.")
-        while running:
-            _G.root.update()
-            await asyncio.sleep(LOOP_WAIT)
-        logging.info("GUI loop stopped.")
+        await pump.run()
+        logging.info(f"GUI loop stopped after {pump.wakeups} wakeups.")
 
         # Clean up all asyncio tasks on exit.
         for task in asyncio.all_tasks():
@@ -397,6 +584,7 @@ async def create_app():
         """Callback for when app is closed."""
         nonlocal running
         running = False
+        pump.stop()
         _G.root.destroy()
         _G.root.quit()
         logging.info("App quitting...")
@@ -411,8 +599,13 @@ async def create_app():
             _on_quit()
 
 
-def run_story(story: Callable[[Controller], Any]):
-    """Run `story` function in separate "game thread"."""
+def run_story(story: Union[Callable[[Controller], Any], AsyncStory]):
+    """Run `story` function to completion.
+
+    `async def` stories are given an `AsyncController` and run directly on the main
+    thread event loop. Other stories are given a `Controller` and run in a separate
+    "game thread".
+    """
     logging.basicConfig(level=logging.INFO)
 
     def _wrapper(G: Controller):
@@ -425,12 +618,24 @@ def run_story(story: Callable[[Controller], Any]):
             log.exception("Error while executing story", exc_info=e)
             raise e
 
+    async def _awrapper(G: AsyncController):
+        """Wrapper to ensure errors are reported."""
+        try:
+            await story(G)  # type: ignore[misc]
+        except Exception as e:
+            log.exception("Error while executing story", exc_info=e)
+            raise e
+
     async def _run_story():
         """Asyncio entrypoint task."""
         try:
-            async with create_app() as G:
-                # Run story in separate "game thread".
-                await asyncio.to_thread(_wrapper, G)
+            async with create_app() as A:
+                if inspect.iscoroutinefunction(story):
+                    await _awrapper(A)
+                else:
+                    # Run story in separate "game thread".
+                    G = create_sync_controller(A, asyncio.get_running_loop())
+                    await asyncio.to_thread(_wrapper, G)
 
                 # Don't exit when "game thread" finishes.
                 while True:
@@ -439,6 +644,8 @@ def run_story(story: Callable[[Controller], Any]):
             pass
 
     try:
-        asyncio.run(_run_story())
+        # Let asyncio sleep in Tk's event loop instead of polling it.
+        with asyncio.Runner(loop_factory=new_event_loop) as runner:
+            runner.run(_run_story())
     except KeyboardInterrupt:
         pass
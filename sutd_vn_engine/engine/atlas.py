@@ -0,0 +1,212 @@
+"""Sprite atlas, packing related images into one sheet decoded & uploaded once."""
+
+import hashlib
+import json
+import logging
+import os
+import tkinter as tk
+from math import ceil, sqrt
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from .png import Pixels, decode_png, to_photo
+from .rawcache import RawCache
+
+__all__ = ["Atlas", "Region", "pack"]
+
+log = logging.getLogger(__name__)
+
+ATLAS_VERSION = 1
+"""Bumped whenever the index format or packing changes, to invalidate atlases."""
+
+
+class Region(NamedTuple):
+    """Position of an image in an atlas sheet."""
+
+    x: int
+    y: int
+    width: int
+    height: int
+
+
+def pack(sizes: Sequence[Tuple[int, int]]):
+    """Pack rectangles of `sizes` onto shelves, tallest first.
+
+    Shelves are about as wide as a square holding all the rectangles would be.
+
+    Returns:
+        Tuple[Tuple[int, int], List[Region]]: Size of sheet & region of each size.
+    """
+    width = max(max(w for w, _ in sizes), ceil(sqrt(sum(w * h for w, h in sizes))))
+    regions: List[Optional[Region]] = [None] * len(sizes)
+    x = y = shelf = 0
+    for i in sorted(range(len(sizes)), key=lambda i: -sizes[i][1]):
+        w, h = sizes[i]
+        if x + w > width:
+            x, y, shelf = 0, y + shelf, 0
+        regions[i] = Region(x, y, w, h)
+        x += w
+        shelf = max(shelf, h)
+    used_w = max(r.x + r.width for r in regions if r)
+    return (used_w, y + shelf), [r for r in regions if r]
+
+
+def _rgba(pixels: Pixels):
+    """Add opaque alpha channel to RGB `pixels`."""
+    w, h, channels, data = pixels
+    if channels == 4:
+        return pixels
+    out = bytearray(b"\xff" * (w * h * 4))
+    for c in range(3):
+        out[c::4] = data[c::3]
+    return Pixels(w, h, 4, bytes(out))
+
+
+class Atlas:
+    """Images packed into one sheet, so a single decode & upload gives all of them.
+
+    Images are looked up by their file path. Each is cut out of the uploaded sheet
+    with Tk's `copy -from`, without touching the filesystem. Sheets are stored in a
+    `RawCache` folder with a JSON index of regions, & rebuilt when any of the
+    images change.
+    """
+
+    def __init__(
+        self,
+        pixels: Pixels,
+        regions: Dict[str, Region],
+        digests: Dict[str, str],
+    ):
+        """Create atlas from a packed sheet, see `build()` & `load()`.
+
+        Args:
+            pixels (Pixels): Sheet.
+            regions (Dict[str, Region]): Region of each image, by file path.
+            digests (Dict[str, str]): Hash of each image file, by file path.
+        """
+        self.pixels = pixels
+        self.regions = regions
+        self.digests = digests
+        self._sheet: Optional[tk.PhotoImage] = None
+
+    @staticmethod
+    def _digest(img_fp: str):
+        """Hash of image file's contents."""
+        return hashlib.sha256(Path(img_fp).read_bytes()).hexdigest()[:32]
+
+    @classmethod
+    def build(cls, img_fps: Sequence[Union[str, Path]]):
+        """Decode images & pack them into a new atlas.
+
+        Raises:
+            OSError: If an image cannot be read.
+            ValueError: If an image is not a valid PNG.
+        """
+        paths = [str(fp) for fp in img_fps]
+        images = [decode_png(fp) for fp in paths]
+        if any(img.channels == 4 for img in images):
+            images = [_rgba(img) for img in images]
+        channels = images[0].channels
+        (width, height), regions = pack([(img.width, img.height) for img in images])
+
+        sheet = bytearray(width * height * channels)
+        stride = width * channels
+        for img, (x, y, w, h) in zip(images, regions):
+            row = w * channels
+            for r in range(h):
+                start = (y + r) * stride + x * channels
+                sheet[start : start + row] = img.data[r * row : (r + 1) * row]
+        return cls(
+            Pixels(width, height, channels, bytes(sheet)),
+            dict(zip(paths, regions)),
+            {fp: cls._digest(fp) for fp in paths},
+        )
+
+    @classmethod
+    def load(cls, name: str, img_fps: Sequence[Union[str, Path]], cache: RawCache):
+        """Load atlas `name` of `img_fps` from `cache`, building it if out of date.
+
+        Raises:
+            OSError: If an image cannot be read.
+            ValueError: If an image is not a valid PNG.
+        """
+        paths = [str(fp) for fp in img_fps]
+        digests = {fp: cls._digest(fp) for fp in paths}
+        digest = hashlib.sha256(
+            json.dumps([ATLAS_VERSION, [digests[fp] for fp in paths]]).encode()
+        ).hexdigest()[:32]
+        index_fp = cache.path / f"{name}.atlas.json"
+        sheet_fp = cache.path / f"{name}.atlas.{digest}.pxm"
+
+        try:
+            index = json.loads(index_fp.read_text(encoding="utf-8"))
+            if index["digest"] == digest:
+                pixels = cache.load(sheet_fp)
+                if pixels is not None:
+                    regions = {
+                        fp: Region(*index["regions"][Path(fp).name]) for fp in paths
+                    }
+                    return cls(pixels, regions, digests)
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+        log.info(f"Building atlas {name} of {len(paths)} images.")
+        atlas = cls.build(paths)
+        cache.save(sheet_fp, atlas.pixels)
+        index = {
+            "version": ATLAS_VERSION,
+            "digest": digest,
+            "regions": {Path(fp).name: r for fp, r in atlas.regions.items()},
+        }
+        try:
+            tmp_fp = index_fp.with_suffix(f".{os.getpid()}.tmp")
+            tmp_fp.write_text(json.dumps(index), encoding="utf-8")
+            os.replace(tmp_fp, index_fp)
+        except OSError as e:
+            log.warning(f"Failed to save atlas index {index_fp}: {e}")
+        return atlas
+
+    def __contains__(self, img_fp: str):
+        """Whether image is in atlas."""
+        return str(img_fp) in self.regions
+
+    def crop(self, img_fp: str):
+        """Get pixels of image. Safe to call from any thread."""
+        x, y, w, h = self.regions[str(img_fp)]
+        _, _, channels, data = self.pixels
+        stride = self.pixels.stride
+        row = w * channels
+        starts = range(y * stride + x * channels, (y + h) * stride, stride)
+        return Pixels(w, h, channels, b"".join(data[i : i + row] for i in starts))
+
+    def photo(self, master: tk.Misc, img_fp: str):
+        """Get image as a new `tk.PhotoImage`, uploading the sheet the first time.
+
+        Must be called on the Tk thread.
+        """
+        if self._sheet is None:
+            self._sheet = to_photo(master, self.pixels)
+        x, y, w, h = self.regions[str(img_fp)]
+        img = tk.PhotoImage(master=master, width=w, height=h)
+        img.tk.call(img, "copy", self._sheet, "-from", x, y, x + w, y + h)
+        return img
+
+
+# Time building & loading an atlas of the faces.
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    from .utils import ASSETS_DIR
+
+    faces = sorted(ASSETS_DIR.glob("face_*.png")) + [ASSETS_DIR / "background.png"]
+    cache = RawCache(tempfile.mkdtemp(prefix="sutd_vn_atlas_"))
+    for label in ("Build", "Load"):
+        start = time.perf_counter()
+        atlas = Atlas.load("faces", faces, cache)
+        dt = (time.perf_counter() - start) * 1e3
+        w, h = atlas.pixels[:2]
+        print(f"{label} {len(faces)} images as {w}x{h} sheet: {dt:.1f} ms")
+    for fp in faces:
+        assert bytes(atlas.crop(str(fp)).data) == decode_png(fp).data
+    print(json.loads((cache.path / "faces.atlas.json").read_text())["regions"])
@@ -0,0 +1,111 @@
+"""Auto-play pacing, using a model of how long lines take to read."""
+
+import asyncio
+import logging
+from typing import NamedTuple, Optional
+
+__all__ = ["ReadTime", "AutoPlay", "VirtualClock"]
+
+log = logging.getLogger(__name__)
+
+
+class ReadTime(NamedTuple):
+    """Model of how long a line takes to read after it is fully shown."""
+
+    base: float = 1.0
+    """Seconds per line."""
+    per_char: float = 0.04
+    """Seconds per character."""
+
+    def __call__(self, text: str):
+        """Seconds to read `text`."""
+        return self.base + self.per_char * len(text)
+
+
+class AutoPlay:
+    """Paces the story by waiting for the last line to be read before advancing.
+
+    A single timer is scheduled on the event loop when a line finishes showing, and
+    rescheduled by the next line instead of sleeping per line. `wait()` blocks till
+    the timer fires, or returns immediately when auto-play is disabled.
+    """
+
+    def __init__(self, model: ReadTime = ReadTime(), enabled: bool = False):
+        """Create auto-play pacer.
+
+        Args:
+            model (ReadTime, optional): Read time model. Defaults to `ReadTime()`.
+            enabled (bool, optional): Whether to pace the story. Defaults to False.
+        """
+        self.model = model
+        self.enabled = enabled
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Resolved when the timer fires, awaited by the next line.
+        self._ready: Optional[asyncio.Future] = None
+
+    def schedule(self, text: str):
+        """Start timer for reading `text`, replacing any pending timer."""
+        if not self.enabled:
+            return
+        loop = asyncio.get_running_loop()
+        if self._timer is not None:
+            self._timer.cancel()
+        if self._ready is None or self._ready.done():
+            self._ready = loop.create_future()
+        self._timer = loop.call_later(self.model(text), self.advance)
+
+    def advance(self):
+        """Fire pending timer now, e.g. when skipping."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._ready is not None and not self._ready.done():
+            self._ready.set_result(None)
+
+    def set_enabled(self, enabled: bool):
+        """Enable or disable auto-play, releasing any line waiting if disabled."""
+        self.enabled = enabled
+        if not enabled:
+            self.advance()
+
+    async def wait(self):
+        """Wait till the last line is read, if enabled."""
+        if self.enabled and self._ready is not None and not self._ready.done():
+            await asyncio.shield(self._ready)
+
+
+class VirtualClock:
+    """Estimates playthrough time of headless runs without waiting.
+
+    Each line costs its typing animation plus its read time, like in the GUI with
+    auto-play enabled. Each prompt costs its read time plus `reply_time`.
+    """
+
+    def __init__(
+        self,
+        model: ReadTime = ReadTime(),
+        type_delay: float = 0.03,
+        reply_time: float = 0.0,
+    ):
+        """Create clock at 0.
+
+        Args:
+            model (ReadTime, optional): Read time model. Defaults to `ReadTime()`.
+            type_delay (float, optional): Seconds per character of the typing
+                animation. Defaults to 0.03, the same as `ChatLog.add_anim_msg()`.
+            reply_time (float, optional): Seconds taken to reply to a prompt.
+                Defaults to 0.0.
+        """
+        self.model = model
+        self.type_delay = type_delay
+        self.reply_time = reply_time
+        self.now = 0.0
+        """Seconds elapsed so far."""
+
+    def on_print(self, text: str):
+        """Advance by the time to show & read `text`."""
+        self.now += self.type_delay * len(text) + self.model(text)
+
+    def on_input(self, prompt: str):
+        """Advance by the time to read & reply to `prompt`."""
+        self.now += self.model(prompt) + self.reply_time
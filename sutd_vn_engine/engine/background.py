@@ -0,0 +1,160 @@
+"""Layered background images for a canvas."""
+
+import logging
+import tkinter as tk
+from typing import Dict, Optional, Tuple
+
+from .image import IMAGE_CACHE, ImageCache
+from .pump import get_pump
+from .resample import scaled_size
+
+__all__ = ["BackgroundLayer", "fit_width", "get_bg_layers", "set_canvas_bg"]
+
+log = logging.getLogger(__name__)
+
+
+def fit_width(
+    image_path: str, width: int, cache: ImageCache = IMAGE_CACHE
+) -> Optional[Tuple[int, int]]:
+    """Get size to scale `image_path` to, to be `width` px wide, or None if unknown.
+
+    The original size is looked up with `cache.image_size()`.
+    """
+    try:
+        size = cache.image_size(image_path)
+    except (OSError, ValueError):
+        return None
+    return scaled_size(size, width / size[0])
+
+
+class BackgroundLayer:
+    """A single canvas image item, rescaled to fit its canvas.
+
+    Setting a new image reuses the same canvas item, and only the currently shown
+    image is referenced by the layer. Decoded & scaled variants are kept in an
+    `ImageCache`, keyed by path & size, which bounds memory used by old images.
+    Images are decoded & scaled in the background, and swapped in once ready.
+    """
+
+    def __init__(
+        self,
+        canvas: tk.Canvas,
+        xratio: float = 0.5,
+        yratio: float = 0.5,
+        resize: bool = True,
+        anchor: str = "center",
+        cache: ImageCache = IMAGE_CACHE,
+    ):
+        """Create layer on top of all existing canvas items.
+
+        Args:
+            canvas (tk.Canvas): Canvas to draw on.
+            xratio (float, optional): X position relative to canvas width. Defaults
+                to 0.5.
+            yratio (float, optional): Y position relative to canvas height. Defaults
+                to 0.5.
+            resize (bool, optional): Whether to scale image to canvas width.
+                Defaults to True.
+            anchor (str, optional): Anchor of image item. Defaults to "center".
+            cache (ImageCache, optional): Cache of decoded images. Defaults to
+                `IMAGE_CACHE`.
+        """
+        self.canvas = canvas
+        self.xratio = xratio
+        self.yratio = yratio
+        self.resize = resize
+        self.cache = cache
+        self.image_path: Optional[str] = None
+        self.img: Optional[tk.PhotoImage] = None
+        self._pending: Optional[tuple] = None
+        """Path & size of image being decoded to be shown next."""
+        self.item = canvas.create_image(0, 0, anchor=anchor)
+
+    def set(self, image_path: str):
+        """Show `image_path` on this layer."""
+        self.image_path = str(image_path)
+        self.refresh()
+
+    def fit_size(self, image_path: str) -> Optional[Tuple[int, int]]:
+        """Get size to scale `image_path` to, to fit canvas width, or None."""
+        width = self.canvas.winfo_width()
+        # Canvas has no size until it is first laid out.
+        if not self.resize or width <= 1:
+            return None
+        return fit_width(image_path, width, self.cache)
+
+    def fit(self, image_path: str):
+        """Get `image_path` decoded & scaled to fit canvas, without showing it."""
+        return self.cache.get(self.canvas, image_path, self.fit_size(image_path))
+
+    def swap(self, img: tk.PhotoImage):
+        """Show an image already decoded by `fit()`."""
+        if img is not self.img:
+            self.img = img
+            self.canvas.itemconfig(self.item, image=img)
+
+    def refresh(self):
+        """Reposition image, & rescale it to fit canvas once it is scaled."""
+        if self.image_path is None:
+            return
+        width, height = self.canvas.winfo_width(), self.canvas.winfo_height()
+        x, y = int(width * self.xratio), int(height * self.yratio)
+        self.canvas.coords(self.item, x, y)
+
+        pending = self._pending = (self.image_path, self.fit_size(self.image_path))
+
+        def _swap():
+            """Show scaled image, unless the layer changed since."""
+            if self._pending != pending:
+                self.cache.discard(*pending)
+                return
+            try:
+                self.swap(self.cache.get(self.canvas, *pending))
+                get_pump(self.canvas).wake()
+            except tk.TclError:
+                log.warning("App exited before background was shown.")
+
+        self.cache.when_ready(pending[0], _swap, pending[1])
+
+
+def get_bg_layers(canvas: tk.Canvas):
+    """Add/retrieve map of layer names to `BackgroundLayer` of `canvas`.
+
+    A single `<Configure>` handler is bound per canvas to refresh all its layers.
+    """
+    layers: Optional[Dict[str, BackgroundLayer]] = getattr(canvas, "bg_layers", None)
+    if layers is None:
+        layers = {}
+        setattr(canvas, "bg_layers", layers)
+
+        def _on_configure(_):
+            """Re-scale all layers to fit canvas."""
+            for layer in layers.values():
+                layer.refresh()
+
+        canvas.bind("<Configure>", _on_configure, "+")
+    return layers
+
+
+def set_canvas_bg(
+    canvas: tk.Canvas,
+    image_path: str,
+    xratio: float = 0.5,
+    yratio: float = 0.5,
+    resize: bool = True,
+    anchor: str = "center",
+    layer: str = "bg",
+):
+    """Set background image of `canvas` to `image_path`.
+
+    Each `layer` is created on top of existing canvas items the first time it is
+    used, and its image is swapped in place afterwards.
+
+    Returns:
+        BackgroundLayer: Layer the image was set on.
+    """
+    layers = get_bg_layers(canvas)
+    if layer not in layers:
+        layers[layer] = BackgroundLayer(canvas, xratio, yratio, resize, anchor)
+    layers[layer].set(image_path)
+    return layers[layer]
@@ -5,9 +5,15 @@ import sys
 import tkinter as tk
 import tkinter.font as tkFont
 import tkinter.ttk as ttk
-from typing import List, Literal, Optional, TypeAlias
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Literal, NamedTuple, Optional, Sequence, TypeAlias
 
-from sutd_vn_engine.engine.utils import EM, LORUM
+from sutd_vn_engine.engine.layout import TextLayout
+from sutd_vn_engine.engine.pump import get_pump
+from sutd_vn_engine.engine.search import SearchIndex
+from sutd_vn_engine.engine.transcript import Message, Transcript
+from sutd_vn_engine.engine.utils import EM, LOOP_WAIT, LORUM
 
 __all__ = ["ChatLog", "_MsgSide"]
 
@@ -16,14 +22,33 @@ _MsgSide: TypeAlias = Literal["left", "right", "center"]
 """Positions message can be placed in ChatLog."""
 
 
+class _Row(NamedTuple):
+    """Recyclable widget used to display a message."""
+
+    label: ttk.Label
+    """Message widget."""
+    var: tk.StringVar
+    """Text variable of `label`."""
+    item: int
+    """Canvas id of window containing `label`."""
+
+
 class ChatLog(ttk.Labelframe):
-    """ChatLog widget."""
+    """ChatLog widget.
+
+    Messages are kept as data in `messages`, a `Transcript` that keeps only recent
+    messages in memory. Only the messages within the visible viewport (plus
+    `margin` screens above & below) get a widget, and widgets are recycled as the
+    log is scrolled, so the widget count stays bounded however long the log gets.
+    """
 
     def __init__(
         self,
         master: Optional[tk.Misc] = None,
         ncols: int = 32,
         msgcols: int = 22,
+        margin: float = 1.0,
+        transcript: Optional[Transcript] = None,
         **kwargs,
     ):
         """Create ChatLog widget.
@@ -32,41 +57,90 @@ class ChatLog(ttk.Labelframe):
             master (Optional[tk.Misc], optional): Master widget. Defaults to None.
             ncols (int, optional): Number of columns total. Defaults to 32.
             msgcols (int, optional): Column span of messages. Defaults to 22.
+            margin (float, optional): Screens of messages kept materialized above &
+                below the viewport. Defaults to 1.0.
+            transcript (Optional[Transcript], optional): Transcript to store
+                messages in, closed with the widget. Defaults to None to create
+                a temporary one.
             **kwargs: Keyword arguments for ttk.Labelframe.
         """
         super(ChatLog, self).__init__(
             master, text="Chat Log", class_="ChatLog", **kwargs
         )
-        self.messages: List[dict] = []
+        self.messages = Transcript() if transcript is None else transcript
+        self.search_index = SearchIndex()
         self.ncols = ncols
         self.msgcols = msgcols
+        self.margin = margin
 
         self.name = ""
         self.side: _MsgSide = "center"
 
+        # Height of each message & y coordinate of its top. `_tops` has an extra
+        # entry at the end for the total height. Arrays keep these at 4 & 8 bytes
+        # per message, instead of a Python int object each.
+        self._heights = array("I")
+        self._tops = array("Q", [0])
+        # Number of characters shown for messages still being animated.
+        self._shown: Dict[int, int] = {}
+        # Materialized & free widgets.
+        self._live: Dict[int, _Row] = {}
+        self._pool: List[_Row] = []
+        # Whether view is scrolled to the bottom.
+        self._at_bottom = True
+        self._measure_id: Optional[str] = None
+
         self._init_gui()
         self._init_style()
 
     def _init_gui(self):
         """Init GUI."""
         # Create widgets.
+        searchbar = ttk.Frame(self)
+        search_entry = ttk.Entry(searchbar)
+        search_status = ttk.Label(searchbar, text="Search", width=9, anchor="e")
         canvas = tk.Canvas(self, highlightthickness=0, bd=0, width=0, height=0)
-        inner = tk.Frame(canvas, bd=0)
         scroll = ttk.Scrollbar(self, orient="vertical", command=canvas.yview)
 
+        # (Query, number of messages) of `results`, to redo stale searches.
+        searched = ("", 0)
+        results: Sequence[int] = []
+        pos = 0
+
+        def _on_search(step: int):
+            """Jump to next (-1 for older, 1 for newer) message matching query."""
+            nonlocal searched, results, pos
+            query = search_entry.get()
+            if (query, len(self.messages)) != searched:
+                searched = (query, len(self.messages))
+                results = self.search(query)
+                pos = len(results) if step < 0 else -1
+            if not results:
+                search_status.config(text="0/0")
+                return
+            pos = (pos + step) % len(results)
+            self.scroll_to(results[pos])
+            search_status.config(text=f"{pos + 1}/{len(results)}")
+
+        search_entry.bind("<Return>", lambda _: _on_search(-1))
+        search_entry.bind("<Shift-Return>", lambda _: _on_search(1))
+
+        def _on_yview(first: str, last: str):
+            """Update scrollbar & materialized messages when view changes."""
+            scroll.set(first, last)
+            self._at_bottom = float(last) >= 1.0
+            self._layout()
+
         # Configure scrollbar for canvas.
-        canvas.config(yscrollcommand=scroll.set)
+        canvas.config(yscrollcommand=_on_yview)
 
         # Place widgets.
-        inner_id = canvas.create_window((0, 0), window=inner, anchor="nw")
+        search_entry.pack(fill="x", expand=True, side="left")
+        search_status.pack(side="right")
+        searchbar.pack(fill="x", side="top")
         canvas.pack(fill="both", expand=True, side="left")
         scroll.pack(fill="y", side="right")
 
-        def _on_canvas_configure(event: tk.Event):
-            """Update inner frame size when canvas is resized."""
-            canvas.coords(inner_id, 0, 0)
-            canvas.itemconfig(inner_id, width=event.width)
-
         def _on_canvas_mousewheel(event: tk.Event):
             """Scroll canvas when mousewheel is used."""
             # Get coords.
@@ -74,9 +148,10 @@ class ChatLog(ttk.Labelframe):
             cx -= canvas.winfo_rootx()
             cy -= canvas.winfo_rooty()
 
-            # Check if mouse is over inner frame.
-            x1, y1, x2, y2 = canvas.bbox(inner_id)
-            if cx < x1 or cx > x2 or cy < y1 or cy > y2:
+            # Check if mouse is over canvas.
+            if cx < 0 or cx > canvas.winfo_width():
+                return
+            if cy < 0 or cy > canvas.winfo_height():
                 return
 
             # Calculate scroll delta.
@@ -95,7 +170,6 @@ class ChatLog(ttk.Labelframe):
 
             canvas.yview_scroll(delta, "units")
 
-        canvas.bind("<Configure>", _on_canvas_configure)
         if sys.platform == "linux":
             canvas.bind_all("<Button-4>", _on_canvas_mousewheel)
             canvas.bind_all("<Button-5>", _on_canvas_mousewheel)
@@ -103,44 +177,174 @@ class ChatLog(ttk.Labelframe):
             canvas.bind_all("<MouseWheel>", _on_canvas_mousewheel)
 
         self.canvas = canvas
-        self.inner = inner
         self.scroll = scroll
 
     def _init_style(self):
         """Init style."""
         self.style = ttk.Style(self)
+        self.font = tkFont.nametofont("TkDefaultFont")
+        self.layout = TextLayout(self.font)
 
         # Common style for all messages.
-        common = dict(relief="raised", padding=EM[0])
-
-        # Common grid placement properties for messages.
-        self.placement = dict(
-            columnspan=self.msgcols,
-            sticky="ew",
-            padx=EM[0],
-            pady=(0.3 * EM[0], 0.7 * EM[0]),
-        )
+        common = dict(relief="raised", padding=EM[0], wraplength=1)
+
+        # Vertical padding around messages.
+        self.pady = (round(0.3 * EM[0]), round(0.7 * EM[0]))
+
+        # Message geometry, updated when canvas is resized.
+        self.colwidth = 0
+        self.msgwidth = 1
+        self.wraplength = 1
+
+        # Canvas width to apply once pending `<Configure>` events are coalesced.
+        width = 0
+        configure_id: Optional[str] = None
 
-        def _on_inner_configure(event: tk.Event):
-            """Update message wrap & canvas scroll area when inner frame is resized."""
-            cwidth = event.width // self.ncols
-            common["wraplength"] = cwidth * self.msgcols - 4 * common["padding"]
-            self.inner.columnconfigure([*range(self.ncols)], minsize=cwidth, weight=1)
+        def _on_canvas_configure(event: tk.Event):
+            """Schedule relayout when canvas is resized, once per burst of events."""
+            nonlocal width, configure_id
+            width = event.width
+            if configure_id is None:
+                configure_id = self.after_idle(_relayout)
+
+        def _relayout():
+            """Update message wrap & layout for the latest canvas width."""
+            nonlocal configure_id
+            configure_id = None
+            cwidth = width // self.ncols
+            if cwidth != self.colwidth:
+                self.colwidth = cwidth
+                self.msgwidth = max(cwidth * self.msgcols - 2 * EM[0], 1)
+                self.wraplength = max(cwidth * self.msgcols - 4 * common["padding"], 1)
+                if self.font.metrics("linespace") != self.layout.linespace:
+                    self.layout.update_font()
+                common["wraplength"] = self.wraplength
+
+                # Position specific styles for messages.
+                left = common | dict(background="white")
+                right = common | dict(background="lightgreen")
+                center = common | dict(background="lightblue", justify="center")
+
+                # Update styles.
+                self.style.configure("Left.TLabel", **left)
+                self.style.configure("Right.TLabel", **right)
+                self.style.configure("Center.TLabel", **center)
+
+                # All heights change with the wrap length. Widths seen before are
+                # cached by `layout`.
+                heights = (self._estimate_height(m.text) for m in self.messages)
+                self._heights = array("I", heights)
+                self._update_tops(0)
+                self._release(list(self._live))
+
+            if self._at_bottom:
+                self.canvas.yview_moveto(1)
+            self._layout()
 
-            # Position specific styles for messages.
-            left = common | dict(background="white")
-            right = common | dict(background="lightgreen")
-            center = common | dict(background="lightblue", justify="center")
+        self.canvas.bind("<Configure>", _on_canvas_configure)
 
-            # Update styles.
-            self.style.configure("Left.TLabel", **left)
-            self.style.configure("Right.TLabel", **right)
-            self.style.configure("Center.TLabel", **center)
+    def _estimate_height(self, text: str):
+        """Estimate height of message from its wrapped text, before it is measured."""
+        label = self.layout.height(text, self.wraplength) + 2 * EM[0] + 4
+        return label + sum(self.pady)
 
-            # Update canvas scroll area.
-            self.canvas.config(scrollregion=(0, 0, 0, event.height))
+    def _update_tops(self, start: int):
+        """Recompute message tops from message `start` onwards & the scroll area."""
+        del self._tops[start + 1 :]
+        for h in self._heights[start:]:
+            self._tops.append(self._tops[-1] + h)
+        self.canvas.config(scrollregion=(0, 0, 0, self._tops[-1]))
 
-        self.inner.bind("<Configure>", _on_inner_configure)
+    def _placement(self, side: _MsgSide):
+        """Get column, style & anchor of message on `side`."""
+        if side == "left":
+            return 0, "Left.TLabel", "w"
+        elif side == "right":
+            return self.ncols - self.msgcols, "Right.TLabel", "w"
+        elif side == "center":
+            return (self.ncols - self.msgcols) // 2, "Center.TLabel", "center"
+        raise ValueError(f"Side {side} not supported.")
+
+    def _materialize(self, i: int):
+        """Display message `i` using a recycled or new widget."""
+        if self._pool:
+            row = self._pool.pop()
+        else:
+            label = ttk.Label(self.canvas)
+            var = tk.StringVar(label)
+            label.config(textvariable=var)
+            item = self.canvas.create_window(0, 0, window=label, anchor="nw")
+            row = _Row(label, var, item)
+
+        msg = self.messages[i]
+        col, style, anchor = self._placement(msg.side)
+        x = col * self.colwidth + EM[0]
+        y = self._tops[i] + self.pady[0]
+
+        row.label.config(style=style, anchor=anchor)
+        row.var.set(msg.text[: self._shown.get(i)])
+        self.canvas.coords(row.item, x, y)
+        self.canvas.itemconfig(row.item, width=self.msgwidth, state="normal")
+        self._live[i] = row
+
+    def _release(self, indices: List[int]):
+        """Hide widgets of messages at `indices` & return them to the pool."""
+        for i in indices:
+            row = self._live.pop(i)
+            self.canvas.itemconfig(row.item, state="hidden")
+            self._pool.append(row)
+
+    def _layout(self):
+        """Materialize messages near the viewport & release the rest."""
+        if not self.messages or self.colwidth == 0:
+            return
+
+        top = self.canvas.canvasy(0)
+        height = self.canvas.winfo_height()
+        pad = height * self.margin
+        lo = max(bisect_right(self._tops, top - pad) - 1, 0)
+        hi = min(bisect_left(self._tops, top + height + pad), len(self.messages))
+
+        self._release([i for i in self._live if not lo <= i < hi])
+        for i in range(lo, hi):
+            if i not in self._live:
+                self._materialize(i)
+
+        # Correct estimated heights once Tk has measured the new widgets.
+        if self._measure_id is None:
+            self._measure_id = self.after_idle(self._measure)
+
+    def _measure(self):
+        """Replace estimated heights of materialized messages with real ones."""
+        self._measure_id = None
+        changed = []
+        for i, row in self._live.items():
+            if i in self._shown:
+                continue
+            h = row.label.winfo_reqheight() + sum(self.pady)
+            if h != self._heights[i]:
+                self._heights[i] = h
+                changed.append(i)
+        if not changed:
+            return
+
+        start = min(changed)
+        self._update_tops(start)
+        for i, row in self._live.items():
+            if i >= start:
+                x = self.canvas.coords(row.item)[0]
+                self.canvas.coords(row.item, x, self._tops[i] + self.pady[0])
+        if self._at_bottom:
+            self.canvas.yview_moveto(1)
+
+    def _set_shown(self, i: int, n: Optional[int]):
+        """Show the first `n` characters of message `i`, or all if `n` is None."""
+        if n is None:
+            self._shown.pop(i, None)
+        else:
+            self._shown[i] = n
+        if i in self._live:
+            self._live[i].var.set(self.messages[i].text[:n])
 
     def _msg(
         self, msg: str, name: Optional[str] = None, side: Optional[_MsgSide] = None
@@ -155,36 +359,35 @@ class ChatLog(ttk.Labelframe):
             side (Optional[_MsgSide], optional): Position of message. Defaults to None.
 
         Returns:
-            Tuple[tk.StringVar, str]: Text variable, full message.
+            Tuple[int, str]: Index of message, full message.
         """
         name = self.name if name is None else name
         side = self.side if side is None else side
         msg = f"{name}:\n{msg}" if name else msg
         msg = msg.strip()
-
-        # Calculate grid placement & style of message.
-        row = len(self.messages)
-        anchor: tk._Anchor = "center" if side == "center" else "w"
-        if side == "left":
-            col = 0
-            style = "Left.TLabel"
-        elif side == "right":
-            col = self.ncols - self.msgcols
-            style = "Right.TLabel"
-        elif side == "center":
-            col = (self.ncols - self.msgcols) // 2
-            style = "Center.TLabel"
-        else:
-            raise ValueError(f"Side {side} not supported.")
-
-        # Create & configure message.
-        message = ttk.Label(self.inner, style=style, anchor=anchor)
-        textvar = tk.StringVar(message, value=msg)
-        message.config(textvariable=textvar)
-        message.grid(**self.placement, row=row, column=col)
-
-        self.messages.append(dict(name=name, side=side, var=textvar, widget=message))
-        return textvar, msg
+        self._placement(side)
+
+        i = self.messages.append(Message(name, side, msg))
+        self.search_index.add(i, msg)
+        self._heights.append(self._estimate_height(msg))
+        self._update_tops(len(self.messages) - 1)
+        return len(self.messages) - 1, msg
+
+    def search(self, query: str):
+        """Get indices of messages containing every word in `query`, in order."""
+        return self.search_index.search(query)
+
+    def scroll_to(self, i: int):
+        """Scroll canvas so message `i` is at the top & materialize it."""
+        self.canvas.yview_moveto(self._tops[i] / max(self._tops[-1], 1))
+        self._at_bottom = False
+        self._layout()
+
+    def scroll_to_bottom(self):
+        """Scroll canvas to bottom & materialize the messages there."""
+        self.canvas.yview_moveto(1)
+        self._at_bottom = True
+        self._layout()
 
     def add_msg(
         self, msg: str, name: Optional[str] = None, side: Optional[_MsgSide] = None
@@ -199,10 +402,7 @@ class ChatLog(ttk.Labelframe):
             side (Optional[_MsgSide], optional): Position of message. Defaults to None.
         """
         self._msg(msg, name, side)
-
-        # Scroll canvas to bottom.
-        self.update_idletasks()  # Recompute inner frame size first.
-        self.canvas.yview_moveto(1)
+        self.scroll_to_bottom()
 
     async def add_anim_msg(
         self,
@@ -219,25 +419,41 @@ class ChatLog(ttk.Labelframe):
             msg (str): Message to add.
             name (Optional[str], optional): Name of speaker. Defaults to None.
             side (Optional[_MsgSide], optional): Position of message. Defaults to None.
-            delay (int, optional): Delay between each character in ms. Defaults to 10.
+            delay (int, optional): Delay between each character in ms. Defaults to 30.
         """
-        text, msg = self._msg(msg, name, side)
-
-        cur = ""
+        i, msg = self._msg(msg, name, side)
+        # Space for the full message is reserved upfront, so the log doesn't
+        # relayout while typing.
+        self._shown[i] = 0
+        self.scroll_to_bottom()
+        loop = asyncio.get_running_loop()
+        pump = get_pump(self)
+
+        start = loop.time()
+        shown = 0
         try:
-            # Animate typing character by character.
-            for c in msg:
-                cur += c
-                text.set(cur)
-                await asyncio.sleep(delay / 1000)
-                self.canvas.yview_moveto(1)
+            # Each frame, reveal however many characters are due by now, so the
+            # number of Tcl calls per frame is constant regardless of `delay`.
+            while shown < len(msg):
+                elapsed = (loop.time() - start) * 1000
+                due = len(msg) if delay <= 0 else int(elapsed // delay) + 1
+                if due > shown:
+                    shown = min(due, len(msg))
+                    self._set_shown(i, shown)
+                    self.scroll_to_bottom()
+                    pump.wake()
+                await asyncio.sleep(LOOP_WAIT)
         except asyncio.CancelledError:
             pass
         finally:
             # Set full message & scroll to bottom when done or cancelled.
-            text.set(msg)
-            self.update_idletasks()
-            self.canvas.yview_moveto(1)
+            self._set_shown(i, None)
+            self.scroll_to_bottom()
+
+    def destroy(self):
+        """Destroy widget & close transcript."""
+        self.messages.close()
+        super(ChatLog, self).destroy()
 
     def set_speaker(self, name: Optional[str] = None, side: Optional[_MsgSide] = None):
         """Set the name & position for subsequent messages.
@@ -252,8 +468,9 @@ class ChatLog(ttk.Labelframe):
         self.side = self.side if side is None else side
 
 
-# Test ChatLog widget.
+# Test ChatLog widget. Pass `--bench` to time appending 10k messages instead.
 if __name__ == "__main__":
+    import time
     from pprint import pprint
 
     # Create and configure window.
@@ -294,7 +511,23 @@ if __name__ == "__main__":
         chatlog.add_msg(LORUM)
         chatlog.add_msg(LORUM)
 
-        pprint(chatlog.messages)
-
-    root.after(500, _test)
+        pprint(list(chatlog.messages))
+
+    def _bench(total: int = 10000, batch: int = 1000):
+        """Append `total` messages, reporting time per append every `batch`."""
+        sides: List[_MsgSide] = ["left", "right", "center"]
+        for start in range(0, total, batch):
+            t = time.perf_counter()
+            for i in range(start, start + batch):
+                chatlog.set_speaker(f"Speaker {i % 7}", sides[i % 3])
+                chatlog.add_msg(LORUM[: 50 + i % 300])
+            root.update()
+            dt = (time.perf_counter() - t) / batch * 1e6
+            print(
+                f"{start + batch:>6} messages: {dt:7.1f} us/append, "
+                f"{len(chatlog._live) + len(chatlog._pool)} widgets"
+            )
+        root.destroy()
+
+    root.after(500, _bench if "--bench" in sys.argv else _test)
     root.mainloop()
@@ -0,0 +1,106 @@
+"""Full screen visual effects."""
+
+import asyncio
+import random
+import tkinter as tk
+from typing import List, Sequence
+
+from .background import set_canvas_bg
+from .image import Image
+from .pump import get_pump
+from .utils import ASSETS_DIR
+from .windowing import create_window
+
+__all__ = ["Jumpscare"]
+
+
+class Jumpscare:
+    """Flickering background with a growing pile of popup windows.
+
+    Everything is allocated before the effect starts: background frames are decoded
+    & scaled once and toggled on a single canvas item, and popups are drawn from a
+    pool of hidden windows sharing one decoded image. Each frame then only moves &
+    shows existing items.
+    """
+
+    def __init__(
+        self,
+        canvas: tk.Canvas,
+        frames: Sequence[str] = ("face_eldritch", "face_obsessed2"),
+        frame_times: Sequence[float] = (0.02, 0.001),
+        popup: str = "face_jumpscare",
+        max_windows: int = 69,
+        window_chance: float = 1.0,
+        window_spawn_time: float = 1.0,
+    ):
+        """Create effect.
+
+        Args:
+            canvas (tk.Canvas): Canvas to draw on.
+            frames (Sequence[str], optional): Asset names of background frames.
+                Defaults to ("face_eldritch", "face_obsessed2").
+            frame_times (Sequence[float], optional): Seconds each frame is shown.
+                Defaults to (0.02, 0.001).
+            popup (str, optional): Asset name of popup image. Defaults to
+                "face_jumpscare".
+            max_windows (int, optional): Number of popups before the effect ends.
+                Defaults to 69.
+            window_chance (float, optional): Chance of a popup per flicker. Defaults
+                to 1.0.
+            window_spawn_time (float, optional): Seconds before popups start.
+                Defaults to 1.0.
+        """
+        self.canvas = canvas
+        self.frames = [f"{ASSETS_DIR}/{name}.png" for name in frames]
+        self.frame_times = frame_times
+        self.popup = f"{ASSETS_DIR}/{popup}.png"
+        self.max_windows = max_windows
+        self.window_chance = window_chance
+        self.window_spawn_time = window_spawn_time
+        self.pool: List[tk.Frame] = []
+
+    def _alloc_windows(self):
+        """Create all popup windows hidden, sharing one decoded image."""
+        while len(self.pool) <= self.max_windows:
+            win = create_window(
+                self.canvas,
+                f"HELLO{self.max_windows - len(self.pool)}",
+                (0, 0, 400, 400),
+                enable_close=True,
+                disable_resize=True,
+                hidden=True,
+            )
+            img = Image(win, img_fp=self.popup)
+            img.pack(fill="both", expand=True)
+            self.pool.append(win)
+
+    def _show_window(self, win: tk.Frame):
+        """Show pooled window at a random position."""
+        x = random.randint(0, self.canvas.winfo_width())
+        y = random.randint(0, self.canvas.winfo_height())
+        win_id = getattr(win, "win_id")
+        self.canvas.coords(win_id, x, y)
+        self.canvas.itemconfig(win_id, state="normal")
+
+    async def play(self):
+        """Play effect until all popups are shown."""
+        pump = get_pump(self.canvas)
+        layer = set_canvas_bg(self.canvas, self.frames[0], layer="story")
+        frames = [layer.fit(fp) for fp in self.frames]
+        self._alloc_windows()
+
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
+        shown = 0
+        while shown < len(self.pool):
+            for img, wait in zip(frames, self.frame_times):
+                layer.swap(img)
+                pump.wake()
+                await asyncio.sleep(wait)
+
+            if loop.time() - start_time < self.window_spawn_time:
+                continue
+
+            if random.random() < self.window_chance:
+                self._show_window(self.pool[shown])
+                shown += 1
@@ -0,0 +1,387 @@
+"""Enumerate every path through a story using the headless backend.
+
+The story is replayed from the start for each prefix of replies, in a process pool.
+When it reaches a prompt beyond the prefix, it is paused and each candidate reply
+is queued as a new prefix. States are deduplicated by the prompt, its position in
+the story (call stack, & instruction of any script `Interpreter`), the flag snapshot,
+and how many times that (prompt, position, flags) already occurred on the path, so
+loops are unrolled at most `max_repeats` times.
+"""
+
+import ast
+import importlib
+import logging
+import os
+import pkgutil
+import re
+import sys
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from types import CodeType, FrameType, ModuleType
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Hashable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from .autoplay import VirtualClock
+from .headless import init_headless
+from .script import Interpreter
+
+__all__ = ["ExploreReport", "explore", "DEFAULT_REPLIES", "DEFAULT_RULES"]
+
+log = logging.getLogger(__name__)
+
+DEFAULT_REPLIES = ("y", "n")
+"""Candidate replies for prompts not matched by any rule."""
+DEFAULT_RULES: Sequence[Tuple[str, Sequence[str]]] = (
+    (r"(?i)\bname\b", ("",)),
+    (r"(?i)how will you reply", ("...",)),
+    (r"(?i)passcode", ("201", "0")),
+)
+"""(Regex, candidate replies) for free text prompts in the bundled story."""
+
+Line = Tuple[str, int]
+"""(Filename, line number)."""
+
+_TRUNCATED = ("<end>", "<truncated>")
+"""State graph node of paths cut off by `max_repeats` or `max_depth`."""
+
+
+class _Pause(BaseException):
+    """Raised to stop the story at the first prompt beyond the reply prefix."""
+
+    def __init__(self, prompt: str, position: Hashable):
+        self.prompt = prompt
+        self.position = position
+
+
+class _Probe(NamedTuple):
+    """Result of replaying the story with a reply prefix."""
+
+    prompt: Optional[str]
+    """Prompt the story paused at, or None if it ended."""
+    position: Hashable
+    """Position in the story of the prompt, see `_position()`."""
+    flags: Hashable
+    """Snapshot of `flags_dict` at the end of the run."""
+    lines: FrozenSet[Line]
+    """Lines executed in the traced modules."""
+    endings: Tuple[str, ...]
+    """Names of ending functions called."""
+    error: Optional[str]
+    """Exception raised by the story, if any."""
+    time: float
+    """Estimated playthrough time in seconds, see `VirtualClock`."""
+
+
+class ExploreReport(NamedTuple):
+    """Summary of all explored paths."""
+
+    paths: int
+    """Number of distinct paths from start to end."""
+    truncated: int
+    """Number of paths cut off by `max_repeats` or `max_depth`, not in `paths`."""
+    states: int
+    """Number of distinct prompt states explored."""
+    endings: Dict[str, int]
+    """Number of paths reaching each ending."""
+    unreachable: Dict[str, List[int]]
+    """Lines never executed in each traced module."""
+    errors: List[Tuple[Tuple[str, ...], str]]
+    """(Reply prefix, exception) of paths that crashed."""
+    times: Dict[str, Tuple[float, float]]
+    """(Shortest, longest) estimated playthrough time in seconds of explored runs
+    reaching each ending, with auto-play enabled."""
+
+
+def _load_story(story_ref: str) -> Callable:
+    """Import story function from a "module:function" reference."""
+    mod, _, name = story_ref.partition(":")
+    return getattr(importlib.import_module(mod), name or "story")
+
+
+def _snapshot(flags: Dict[str, Any]):
+    """Hashable snapshot of flags."""
+    return tuple(sorted((k, repr(v)) for k, v in flags.items()))
+
+
+def _position(frame: Optional[FrameType]):
+    """Get position of the story paused at `frame`, up to the `_probe()` running it.
+
+    Consists of the (filename, line number) of every frame, and the instruction of
+    every script `Interpreter` called, as script prompts share one call site.
+    """
+    position: List[Hashable] = []
+    while frame is not None and frame.f_code is not _probe.__code__:
+        position.append((frame.f_code.co_filename, frame.f_lineno))
+        interp = frame.f_locals.get("self")
+        if isinstance(interp, Interpreter):
+            position.append(("<script>", interp.ip))
+        frame = frame.f_back
+    return tuple(position)
+
+
+def _probe(story_ref: str, files: FrozenSet[str], prefix: Tuple[str, ...]):
+    """Replay story with `prefix` of replies, tracing executed lines."""
+    story = _load_story(story_ref)
+    lines: Set[Line] = set()
+    endings: List[str] = []
+    replies = iter(prefix)
+
+    def _answer(prompt: str):
+        """Reply from prefix, or pause once it runs out."""
+        for reply in replies:
+            return reply
+        raise _Pause(prompt, _position(sys._getframe(1)))
+
+    def _trace_lines(frame, event, _):
+        """Record executed lines of traced frame."""
+        if event == "line":
+            lines.add((frame.f_code.co_filename, frame.f_lineno))
+        return _trace_lines
+
+    def _trace_calls(frame, event, _):
+        """Trace only frames of functions in traced modules."""
+        code = frame.f_code
+        if code.co_filename not in files:
+            return None
+        if code.co_name.startswith("ending_"):
+            endings.append(code.co_name)
+        return _trace_lines
+
+    clock = VirtualClock()
+    G, _ = init_headless(_answer, clock=clock)
+    prompt = position = error = None
+    sys.settrace(_trace_calls)
+    try:
+        story(G)
+    except _Pause as e:
+        prompt, position = e.prompt, e.position
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        error = repr(e)
+    finally:
+        sys.settrace(None)
+
+    flags = _snapshot(G.flags_dict)
+    return _Probe(
+        prompt, position, flags, frozenset(lines), tuple(endings), error, clock.now
+    )
+
+
+def _code_lines(code: CodeType) -> Iterator[Line]:
+    """Yield executable lines of all functions defined in `code`."""
+    for const in code.co_consts:
+        if isinstance(const, CodeType):
+            for _, _, lineno in const.co_lines():
+                if lineno is not None and lineno != const.co_firstlineno:
+                    yield (const.co_filename, lineno)
+            yield from _code_lines(const)
+
+
+def _is_main_block(node: ast.stmt):
+    """Whether `node` is an `if __name__ == "__main__":` block."""
+    return isinstance(node, ast.If) and ast.unparse(node.test) in (
+        "__name__ == '__main__'",
+        "'__main__' == __name__",
+    )
+
+
+def _module_lines(module: ModuleType):
+    """Get executable lines of all functions in `module`, outside `__main__` blocks.
+
+    Those only run when the module is run as a script, never from the story.
+    """
+    with open(module.__file__, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), module.__file__)
+    tree.body = [node for node in tree.body if not _is_main_block(node)]
+    return set(_code_lines(compile(tree, module.__file__, "exec")))
+
+
+def explore(
+    story_ref: str = "sutd_vn_engine.__main__:story",
+    modules: Sequence[str] = ("sutd_vn_engine.scenarios",),
+    rules: Sequence[Tuple[str, Sequence[str]]] = DEFAULT_RULES,
+    replies: Sequence[str] = DEFAULT_REPLIES,
+    max_repeats: int = 3,
+    max_depth: int = 100,
+    workers: Optional[int] = None,
+):
+    """Drive the story through every combination of candidate replies.
+
+    Args:
+        story_ref (str, optional): "module:function" of story, importable by worker
+            processes. Defaults to "sutd_vn_engine.__main__:story".
+        modules (Sequence[str], optional): Modules or packages whose functions are
+            checked for unreachable lines. The story's own module is always
+            included. Defaults to ("sutd_vn_engine.scenarios",).
+        rules (Sequence[Tuple[str, Sequence[str]]], optional): (Regex, replies) to
+            try for prompts matching regex. Defaults to `DEFAULT_RULES`.
+        replies (Sequence[str], optional): Replies to try for other prompts.
+            Defaults to `DEFAULT_REPLIES`.
+        max_repeats (int, optional): Times a (prompt, position, flags) state may
+            repeat on a path, to unroll loops. Defaults to 3.
+        max_depth (int, optional): Most replies on a path. Defaults to 100.
+        workers (Optional[int], optional): Worker processes, 0 to run in this
+            process. Defaults to None for one per CPU.
+
+    Returns:
+        ExploreReport: Summary of all explored paths.
+    """
+    # Find all modules to trace.
+    traced: Dict[str, ModuleType] = {}
+    for name in [story_ref.partition(":")[0], *modules]:
+        mod = importlib.import_module(name)
+        traced[mod.__name__] = mod
+        if hasattr(mod, "__path__"):
+            for info in pkgutil.walk_packages(mod.__path__, f"{mod.__name__}."):
+                traced[info.name] = importlib.import_module(info.name)
+    files = frozenset(m.__file__ for m in traced.values() if m.__file__)
+    compiled = [(re.compile(regex), tuple(rs)) for regex, rs in rules]
+
+    def _candidates(prompt: str):
+        """Get candidate replies for `prompt`."""
+        for regex, rs in compiled:
+            if regex.search(prompt):
+                return rs
+        return tuple(replies)
+
+    # State graph. Nodes are state keys, or ending names for finished & truncated
+    # paths.
+    children: Dict[Hashable, List[Hashable]] = defaultdict(list)
+    states: Set[Hashable] = set()
+    executed: Set[Line] = set()
+    errors: List[Tuple[Tuple[str, ...], str]] = []
+    times: Dict[str, Tuple[float, float]] = {}
+
+    # Each pending item is (parent node, reply prefix, state counts).
+    root: Hashable = ("<start>",)
+    frontier: List[Tuple[Hashable, Tuple[str, ...], Dict[Hashable, int]]]
+    frontier = [(root, (), {})]
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    pool = ProcessPoolExecutor(workers) if workers != 0 else None
+    try:
+        while frontier:
+            prefixes = [prefix for _, prefix, _ in frontier]
+            args = ([story_ref] * len(prefixes), [files] * len(prefixes), prefixes)
+            if pool is None:
+                probes = list(map(_probe, *args))
+            else:
+                chunksize = max(1, len(prefixes) // (4 * workers))
+                probes = list(pool.map(_probe, *args, chunksize=chunksize))
+
+            next_frontier = []
+            for (parent, prefix, counts), probe in zip(frontier, probes):
+                executed |= probe.lines
+                if probe.error is not None:
+                    errors.append((prefix, probe.error))
+                    children[parent].append(("<end>", f"<error: {probe.error}>"))
+                    continue
+                if probe.prompt is None:
+                    ending = probe.endings[-1] if probe.endings else "<no ending>"
+                    children[parent].append(("<end>", ending))
+                    lo, hi = times.get(ending, (probe.time, probe.time))
+                    times[ending] = (min(lo, probe.time), max(hi, probe.time))
+                    continue
+
+                state = (probe.prompt, probe.position, probe.flags)
+                seen = counts.get(state, 0)
+                key = (*state, seen)
+                # States are explored breadth first, so a state already explored
+                # was reached by a path no longer than this one.
+                if key not in states and (
+                    seen >= max_repeats or len(prefix) >= max_depth
+                ):
+                    children[parent].append(_TRUNCATED)
+                    continue
+                children[parent].append(key)
+                if key in states:
+                    continue
+                states.add(key)
+
+                counts = counts | {state: seen + 1}
+                for reply in _candidates(probe.prompt):
+                    next_frontier.append((key, prefix + (reply,), counts))
+            frontier = next_frontier
+            log.info(f"Explored {len(states)} states, {len(frontier)} pending.")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    # Count paths through the state graph, which is acyclic as repeat counts only
+    # increase along a path.
+    endings: Dict[str, int] = defaultdict(int)
+    memo: Dict[Hashable, Dict[str, int]] = {}
+
+    def _count(node: Hashable) -> Dict[str, int]:
+        """Count paths from `node` to each ending."""
+        if node in memo:
+            return memo[node]
+        if node[0] == "<end>":
+            memo[node] = {node[1]: 1}
+            return memo[node]
+        total: Dict[str, int] = defaultdict(int)
+        for child in children.get(node, []):
+            for name, n in _count(child).items():
+                total[name] += n
+        memo[node] = total
+        return total
+
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 4 * max_depth + 100))
+    for name, n in _count(root).items():
+        endings[name] += n
+    truncated = endings.pop(_TRUNCATED[1], 0)
+
+    unreachable: Dict[str, List[int]] = {}
+    for mod in traced.values():
+        if not mod.__file__:
+            continue
+        missing = sorted(n for f, n in _module_lines(mod) - executed)
+        if missing:
+            unreachable[mod.__name__] = missing
+
+    return ExploreReport(
+        paths=sum(endings.values()),
+        truncated=truncated,
+        states=len(states),
+        endings=dict(endings),
+        unreachable=unreachable,
+        errors=errors,
+        times=times,
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(prog="python -m sutd_vn_engine.engine.explore")
+    parser.add_argument("story", nargs="?", default="sutd_vn_engine.__main__:story")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    report = explore(args.story, workers=args.workers, max_repeats=args.max_repeats)
+    print(f"Explored {report.states} states in {time.perf_counter() - start:.2f}s.")
+    print(f"{report.paths} paths, {report.truncated} more truncated:")
+    for name, n in sorted(report.endings.items()):
+        lo, hi = report.times.get(name, (0.0, 0.0))
+        print(f"  {name}: {n} ({lo / 60:.1f}-{hi / 60:.1f} min on auto-play)")
+    for prefix, error in report.errors:
+        print(f"Error after replies {list(prefix)}: {error}")
+    for mod, lines in report.unreachable.items():
+        print(f"Unreachable in {mod}: lines {lines}")
@@ -0,0 +1,171 @@
+"""Headless backend for running stories without a display."""
+
+import asyncio
+import builtins
+import inspect
+import logging
+from typing import Any, Callable, Iterable, List, Optional, Tuple, Union
+
+from .app import AsyncController, AsyncStory, Controller
+from .autoplay import VirtualClock
+
+__all__ = ["Replies", "init_headless", "to_async", "run_headless"]
+
+log = logging.getLogger(__name__)
+
+Replies = Union[Iterable[str], Callable[[str], str]]
+"""Scripted replies to `input()`, or a function that answers each prompt."""
+
+
+def init_headless(
+    replies: Optional[Replies] = None,
+    echo: bool = False,
+    clock: Optional[VirtualClock] = None,
+):
+    """Creates `Controller` singleton backed by in-memory events instead of a GUI.
+
+    Every call is recorded in order as a tuple in the returned events list, e.g.
+    `("print", speaker, text)` or `("input", prompt, reply)`.
+
+    Args:
+        replies (Optional[Replies], optional): Replies returned by `input()` in order,
+            or a function called with each prompt. `EOFError` is raised once scripted
+            replies run out. Defaults to None to read from stdin.
+        echo (bool, optional): Whether to also write prints & prompts to stdout.
+            Defaults to False.
+        clock (Optional[VirtualClock], optional): Clock advanced by each print &
+            prompt, to estimate playthrough time. Defaults to None.
+
+    Returns:
+        Tuple[Controller, List[tuple]]: Controller, list of events.
+    """
+    events: List[Tuple[Any, ...]] = []
+    speaker = ["", "center"]
+
+    if replies is None:
+
+        def answer(_: str):
+            """Read reply from stdin."""
+            return builtins.input("> ")
+
+    elif callable(replies):
+        answer = replies
+    else:
+        it = iter(replies)
+
+        def answer(prompt: str):
+            """Return next scripted reply."""
+            try:
+                return next(it)
+            except StopIteration:
+                raise EOFError(f"No scripted reply for prompt: {prompt}") from None
+
+    def _input(__prompt: object = "", /):
+        """Emulates `input()`."""
+        text = str(__prompt)
+        if echo:
+            builtins.print(f"[{text}]")
+        reply = answer(text)
+        if clock is not None:
+            clock.on_input(text)
+        events.append(("input", text, reply))
+        return reply
+
+    def _print(*values, sep=" "):
+        """Emulates `print()`."""
+        text = sep.join(map(str, values))
+        events.append(("print", speaker[0], text))
+        if clock is not None:
+            clock.on_print(text)
+        if echo:
+            builtins.print(f"{speaker[0]}: {text}" if speaker[0] else text)
+
+    def _set_speaker(name: Optional[str] = None, side: Optional[str] = None):
+        """Set the name & position for subsequent messages."""
+        speaker[0] = speaker[0] if name is None else name
+        speaker[1] = speaker[1] if side is None else side
+        events.append(("speaker", speaker[0], speaker[1]))
+
+    def _show_face(img_name: str):
+        """Record webcam window image."""
+        events.append(("face", img_name))
+
+    def _show_bg(img_name: str):
+        """Record background image."""
+        events.append(("bg", img_name))
+
+    def _show_jumpscare():
+        """Record jumpscare, which quits the game like in the GUI."""
+        events.append(("jumpscare",))
+        raise KeyboardInterrupt
+
+    _G = Controller(
+        root=None,  # type: ignore[arg-type]
+        flags_dict={},
+        input=_input,
+        print=_print,
+        set_speaker=_set_speaker,
+        show_face=_show_face,
+        show_bg=_show_bg,
+        show_jumpscare=_show_jumpscare,
+    )
+    return _G, events
+
+
+def to_async(G: Controller):
+    """Wrap headless `Controller` as an `AsyncController` for `async def` stories."""
+
+    async def _input(__prompt: object = "", /):
+        """Emulates `input()`."""
+        return G.input(__prompt)
+
+    async def _print(*values, sep=" "):
+        """Emulates `print()`."""
+        G.print(*values, sep=sep)
+
+    async def _show_jumpscare():
+        """Record jumpscare, which quits the game like in the GUI."""
+        G.show_jumpscare()
+
+    return AsyncController(
+        root=G.root,
+        flags_dict=G.flags_dict,
+        input=_input,
+        print=_print,
+        set_speaker=G.set_speaker,
+        show_face=G.show_face,
+        show_bg=G.show_bg,
+        show_jumpscare=_show_jumpscare,
+    )
+
+
+def run_headless(
+    story: Union[Callable[[Controller], Any], AsyncStory],
+    replies: Optional[Replies] = None,
+    echo: bool = True,
+    clock: Optional[VirtualClock] = None,
+):
+    """Run `story` function to completion without a GUI.
+
+    Like `run_story()`, `async def` stories are given an `AsyncController`.
+
+    Args:
+        story (Union[Callable[[Controller], Any], AsyncStory]): Story function.
+        replies (Optional[Replies], optional): See `init_headless()`. Defaults to
+            None to read from stdin.
+        echo (bool, optional): See `init_headless()`. Defaults to True.
+        clock (Optional[VirtualClock], optional): See `init_headless()`. Defaults
+            to None.
+
+    Returns:
+        Tuple[Controller, List[tuple]]: Controller, list of events.
+    """
+    G, events = init_headless(replies, echo, clock)
+    try:
+        if inspect.iscoroutinefunction(story):
+            asyncio.run(story(to_async(G)))
+        else:
+            story(G)
+    except KeyboardInterrupt:
+        log.info("Story quit.")
+    return G, events
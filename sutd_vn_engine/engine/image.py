@@ -1,29 +1,321 @@
 """Widget to display image."""
 
+import asyncio
 import logging
 import tkinter as tk
-from typing import Optional
+from collections import OrderedDict
+from concurrent import futures
+from typing import Callable, Dict, Optional, Tuple
 
-__all__ = ["Image"]
+from .atlas import Atlas
+from .png import Pixels, decode_png, png_size, to_photo
+from .rawcache import RawCache
+from .resample import resize
+
+__all__ = ["Image", "ImageCache", "IMAGE_CACHE"]
 
 log = logging.getLogger(__name__)
 
 
+class ImageCache:
+    """LRU cache of decoded images, keyed by file path & size.
+
+    Decoded images are kept until their total size exceeds `budget` bytes, after
+    which the least recently used are dropped. Widgets hold their own reference to
+    the image they display, so evicting an image in use does not blank it.
+
+    PNGs are read, decoded to raw pixels by `decode_png()` & resized by `resize()`
+    in a pool of worker threads if `prefetch()` or `when_ready()` was called
+    beforehand, so only uploading the pixels to Tk is left for the GUI thread. If
+    given a `RawCache`, the raw pixels are also kept on disk for the next run.
+
+    Images registered with `use_atlas()` are instead cut out of one shared sheet,
+    so switching between them never touches the filesystem.
+    """
+
+    def __init__(
+        self,
+        budget: int = 64 * 2**20,
+        workers: int = 2,
+        filter: str = "nearest",
+        disk: Optional[RawCache] = None,
+    ):
+        """Create cache.
+
+        Args:
+            budget (int, optional): Memory budget in bytes, counting 4 bytes per
+                decoded pixel. Defaults to 64 MiB.
+            workers (int, optional): Threads decoding prefetched images. Defaults
+                to 2.
+            filter (str, optional): Filter used to resize images, see `FILTERS`.
+                Defaults to "nearest", as "box" takes several times longer.
+            disk (Optional[RawCache], optional): On-disk cache of decoded images.
+                Defaults to None.
+        """
+        self.budget = budget
+        self.workers = workers
+        self.filter = filter
+        self.disk = disk
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._images: OrderedDict[tuple, tk.PhotoImage] = OrderedDict()
+        self._pool: Optional[futures.ThreadPoolExecutor] = None
+        self._decoding: Dict[tuple, futures.Future[Pixels]] = {}
+        """Prefetched images by path & size, decoded or being decoded."""
+        self._atlases: Dict[str, futures.Future[Atlas]] = {}
+        """Atlas of each image in one, loaded or being loaded."""
+
+    def _executor(self):
+        """Get pool of worker threads, creating it the first time."""
+        if self._pool is None:
+            self._pool = futures.ThreadPoolExecutor(
+                self.workers, thread_name_prefix="image-decode"
+            )
+        return self._pool
+
+    def use_atlas(self, name: str, *img_fps: str):
+        """Start loading images as one atlas in a worker thread, see `Atlas`.
+
+        Atlases are kept in the disk cache if any, else rebuilt every run.
+        """
+        paths = [str(fp) for fp in img_fps]
+        if self.disk is None:
+            future = self._executor().submit(Atlas.build, paths)
+        else:
+            future = self._executor().submit(Atlas.load, name, paths, self.disk)
+        for fp in paths:
+            self._atlases[fp] = future
+
+    def _atlas(self, img_fp: str, wait: bool = False):
+        """Get atlas containing `img_fp`, or None if there is none or it failed.
+
+        Unless `wait`, None is also returned while the atlas is loading, so the GUI
+        thread never blocks on it & decodes the image alone instead.
+        """
+        future = self._atlases.get(img_fp)
+        if future is None or not (wait or future.done()):
+            return None
+        try:
+            return future.result()
+        except (OSError, ValueError) as e:
+            log.warning(f"Failed to load atlas of {img_fp}, decoding it alone: {e}")
+            self._atlases.pop(img_fp, None)
+            return None
+
+    def image_size(self, img_fp: str) -> Tuple[int, int]:
+        """Get original width & height of image, from its atlas if loaded.
+
+        Raises:
+            OSError: If the file cannot be read.
+            ValueError: If the file is not a valid PNG.
+        """
+        img_fp = str(img_fp)
+        atlas = self._atlas(img_fp)
+        if atlas is not None:
+            _, _, w, h = atlas.regions[img_fp]
+            return w, h
+        return png_size(img_fp)
+
+    def _load(
+        self,
+        img_fp: str,
+        size: Optional[Tuple[int, int]],
+        source: Optional["futures.Future[Pixels]"] = None,
+        wait: bool = True,
+        decode: bool = True,
+    ):
+        """Decode `img_fp`, or wait for `source` to, & resize it to `size` if given.
+
+        Images in an atlas are cut out of it instead of decoded, waiting for it to
+        load if `wait`. Loads the result from & saves it to the disk cache, if any.
+        Unless `decode`, returns None instead of decoding the file with `decode_png()`.
+        """
+        atlas = self._atlas(img_fp, wait)
+        entry = None
+        if self.disk is not None:
+            digest = None if atlas is None else atlas.digests[img_fp]
+            entry = self.disk.entry(img_fp, size, self.filter, digest)
+            pixels = self.disk.load(entry)
+            if pixels is not None:
+                return pixels
+
+        if atlas is not None:
+            pixels = atlas.crop(img_fp)
+            if size is not None:
+                pixels = resize(pixels, *size, self.filter)
+        elif size is None:
+            if not decode:
+                return None
+            pixels = decode_png(img_fp)
+        elif source is None:
+            pixels = resize(self._load(img_fp, None, wait=wait), *size, self.filter)
+        else:
+            pixels = resize(source.result(), *size, self.filter)
+
+        if entry is not None:
+            self.disk.save(entry, pixels)
+        return pixels
+
+    def _submit(self, img_fp: str, size: Optional[Tuple[int, int]] = None):
+        """Start decoding `img_fp` in a worker thread, if not already started."""
+        key = (img_fp, size)
+        # Originals in an atlas are ready as soon as it is.
+        future = self._atlases.get(img_fp) if size is None else None
+        future = future or self._decoding.get(key)
+        if future is None:
+            # Resizes reuse the original being decoded, if any.
+            source = None if size is None else self._decoding.get((img_fp, None))
+            future = self._decoding[key] = self._executor().submit(
+                self._load, img_fp, size, source
+            )
+        return future
+
+    def prefetch(self, *img_fps: str, size: Optional[Tuple[int, int]] = None):
+        """Start decoding images in worker threads, in order, if not cached."""
+        for img_fp in map(str, img_fps):
+            if (img_fp, size) not in self._images:
+                self._submit(img_fp, size)
+
+    def when_ready(
+        self,
+        img_fp: str,
+        callback: Callable[[], None],
+        size: Optional[Tuple[int, int]] = None,
+    ):
+        """Call `callback` once `img_fp` is decoded at `size`, so `get()` won't block.
+
+        It is called immediately if the image is already decoded or there is no
+        running event loop, else on the event loop's thread once decoded.
+        """
+        img_fp = str(img_fp)
+        if (img_fp, size) in self._images:
+            return callback()
+        future = self._submit(img_fp, size)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is None or future.done():
+            return callback()
+
+        def _done(_):
+            """Call `callback` on the event loop, unless it has since closed."""
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(callback)
+
+        future.add_done_callback(_done)
+
+    def discard(self, img_fp: str, size: Optional[Tuple[int, int]] = None):
+        """Drop image prefetched at `size` that is no longer going to be shown."""
+        future = self._decoding.pop((str(img_fp), size), None)
+        if future is not None:
+            future.cancel()
+
+    def _decode(self, master: tk.Misc, img_fp: str, size: Optional[Tuple[int, int]]):
+        """Upload decoded image, decoding it now if it wasn't prefetched.
+
+        `decode_png()` holds the GIL for a long time, so originals that aren't in
+        the disk cache or a loaded atlas are decoded by Tk instead on a miss here.
+        """
+        atlas = self._atlas(img_fp) if size is None else None
+        if atlas is not None:
+            return atlas.photo(master, img_fp)
+        future = self._decoding.pop((img_fp, size), None)
+        # Don't keep the original in memory once any size of it is shown.
+        source = self._decoding.pop((img_fp, None), None)
+        try:
+            if future is None:
+                log.info(f"{img_fp} at {size} wasn't prefetched, loading it now.")
+                pixels = self._load(img_fp, size, source, wait=False, decode=False)
+                if pixels is None:
+                    return tk.PhotoImage(master=master, file=img_fp)
+            else:
+                pixels = future.result()
+        except (OSError, ValueError) as e:
+            # Let Tk try other formats, or raise `tk.TclError` if file is missing.
+            log.debug(f"Decoding {img_fp} with Tk: {e}")
+            return tk.PhotoImage(master=master, file=img_fp)
+        return to_photo(master, pixels)
+
+    def get(
+        self,
+        master: tk.Misc,
+        img_fp: str,
+        size: Optional[Tuple[int, int]] = None,
+    ):
+        """Get decoded image, decoding & caching it if needed.
+
+        Args:
+            master (tk.Misc): Any widget of the Tk app to decode image with.
+            img_fp (str): Path to image file.
+            size (Optional[Tuple[int, int]], optional): Width & height to resize
+                image to. Defaults to None for the original size.
+
+        Returns:
+            tk.PhotoImage: Decoded image.
+        """
+        key = (str(img_fp), size)
+        img = self._images.get(key)
+        if img is not None:
+            self.hits += 1
+            self._images.move_to_end(key)
+            return img
+
+        self.misses += 1
+        img = self._images[key] = self._decode(master, *key)
+        self.size += self._nbytes(img)
+        self._evict()
+        return img
+
+    def clear(self):
+        """Drop all cached images."""
+        self._images.clear()
+        for future in self._decoding.values():
+            future.cancel()
+        self._decoding.clear()
+        self.size = 0
+
+    def _evict(self):
+        """Drop least recently used images until within budget."""
+        while self.size > self.budget and len(self._images) > 1:
+            _, img = self._images.popitem(last=False)
+            self.size -= self._nbytes(img)
+
+    @staticmethod
+    def _nbytes(img: tk.PhotoImage):
+        """Approximate memory used by decoded `img`."""
+        return img.width() * img.height() * 4
+
+
+IMAGE_CACHE = ImageCache(disk=RawCache())
+"""Default image cache shared by all widgets, backed by a `RawCache` on disk."""
+
+
 class Image(tk.Button):
     """Is actually a button."""
 
-    def __init__(self, master: Optional[tk.Misc] = None, img_fp: str = "", **kwargs):
-        """Init."""
+    def __init__(
+        self,
+        master: Optional[tk.Misc] = None,
+        img_fp: str = "",
+        cache: ImageCache = IMAGE_CACHE,
+        **kwargs,
+    ):
+        """Init. Without `img_fp`, the image is blank until `change_img()`."""
         self.img_fp = img_fp
+        self.cache = cache
         super(Image, self).__init__(master, **kwargs)
         self.img = tk.PhotoImage(master=self)
+        if img_fp:
+            try:
+                self.img = cache.get(self, img_fp)
+            except tk.TclError:
+                log.error(f"Image file not found: {img_fp}")
         self.config(image=self.img)
-        try:
-            self.img.config(file=img_fp)
-        except tk.TclError:
-            log.error(f"Image file not found: {img_fp}")
 
     def change_img(self, img_fp):
-        """Change image."""
+        """Change image, reusing the decoded image if it was shown before."""
         self.img_fp = img_fp
-        self.img.config(file=img_fp)
+        self.img = self.cache.get(self, img_fp)
+        self.config(image=self.img)
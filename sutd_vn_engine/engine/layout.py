@@ -0,0 +1,123 @@
+"""Text layout engine for measuring wrapped text without widgets."""
+
+import tkinter.font as tkFont
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+__all__ = ["TextLayout"]
+
+
+class TextLayout:
+    """Counts the lines text wraps to, like a Tk label with `wraplength`.
+
+    Text is broken at spaces, and words wider than a line are broken anywhere, the
+    same as Tk. Word widths are cached per font, and line counts are cached per
+    (text, width) in an LRU of `maxsize` entries, so relaying out a log at a width
+    it was already shown at costs one dict lookup per message. The cache keys on a
+    hash of the text, so it doesn't keep texts alive.
+    """
+
+    def __init__(self, font: tkFont.Font, maxsize: int = 65536):
+        """Create layout engine.
+
+        Args:
+            font (tkFont.Font): Font text is shown in.
+            maxsize (int, optional): Most cached line counts. Defaults to 65536.
+        """
+        self.font = font
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._widths: Dict[str, int] = {}
+        self._lines: OrderedDict[Tuple[int, int, int], int] = OrderedDict()
+        self._version = 0
+        self.update_font()
+
+    def update_font(self):
+        """Drop cached measurements, e.g. after the font is reconfigured."""
+        self._widths.clear()
+        self._lines.clear()
+        self._version += 1
+        self.linespace = self.font.metrics("linespace")
+        # Monospace fonts are measured by counting characters.
+        self._charwidth = self.font.measure("0") if self.font.metrics("fixed") else 0
+        self._space = self._measure(" ")
+
+    def _measure(self, word: str):
+        """Width of `word` in px."""
+        if self._charwidth:
+            return self._charwidth * len(word)
+        width = self._widths.get(word)
+        if width is None:
+            if len(self._widths) >= self.maxsize:
+                self._widths.clear()
+            width = self._widths[word] = self.font.measure(word)
+        return width
+
+    def _count(self, text: str, width: int):
+        """Count lines of `text` wrapped at `width` px."""
+        lines = 0
+        space = self._space
+        for para in text.split("\n"):
+            lines += 1
+            x = 0
+            for word in para.split(" "):
+                w = self._measure(word)
+                if x and x + space + w <= width:
+                    x += space + w
+                    continue
+                if x:
+                    lines += 1
+                # Words wider than a line are broken anywhere.
+                extra, x = divmod(w - 1, width) if w > width else (0, w - 1)
+                lines += extra
+                x += 1
+        return lines
+
+    def lines(self, text: str, width: int):
+        """Number of lines `text` wraps to at `width` px."""
+        width = max(width, 1)
+        key = (hash(text), width, self._version)
+        n = self._lines.get(key)
+        if n is not None:
+            self.hits += 1
+            self._lines.move_to_end(key)
+            return n
+        self.misses += 1
+        n = self._lines[key] = self._count(text, width)
+        if len(self._lines) > self.maxsize:
+            self._lines.popitem(last=False)
+        return n
+
+    def height(self, text: str, width: int):
+        """Height in px of the lines `text` wraps to at `width` px."""
+        return self.lines(text, width) * self.linespace
+
+
+# Time relayout of a long log, with a stand-in proportional font so no display is
+# needed.
+if __name__ == "__main__":
+    import time
+
+    from .utils import LORUM
+
+    class _Font:
+        """Proportional font measuring 6px per character, 3px for "il.,"."""
+
+        def measure(self, text: str):
+            """Width of `text`."""
+            return 6 * len(text) - 3 * sum(text.count(c) for c in "il.,")
+
+        def metrics(self, option: str):
+            """Font metric."""
+            return {"linespace": 14, "fixed": 0}[option]
+
+    N = 10_000
+    texts = [f"Speaker {i % 7}:\n{LORUM[i % 200 :]}" for i in range(N)]
+    layout = TextLayout(_Font())  # type: ignore[arg-type]
+    for width in (300, 500, 300, 500):
+        start = time.perf_counter()
+        total = sum(layout.height(text, width) for text in texts)
+        dt = (time.perf_counter() - start) / N * 1e6
+        print(f"Width {width}: {total}px total, {dt:.2f} us/message")
+    print(f"Line count cache: {layout.hits} hits, {layout.misses} misses")
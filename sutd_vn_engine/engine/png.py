@@ -0,0 +1,405 @@
+"""PNG decoder & encoder using only `zlib`, for decoding images off the Tk thread.
+
+`tk.PhotoImage` decodes PNGs on the thread that creates it, which for Tkinter is
+always the GUI thread. `decode_png()` instead produces raw 8-bit RGB or RGBA pixels
+on any thread, and `to_photo()` uploads them to Tk in a format it can load without
+inflating or unfiltering anything.
+"""
+
+import struct
+import zlib
+from itertools import accumulate
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Tuple, Union
+
+__all__ = [
+    "Pixels",
+    "png_size",
+    "decode_png",
+    "encode_png",
+    "opaque",
+    "to_ppm",
+    "to_photo",
+]
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# (x start, y start, x step, y step) of each Adam7 pass.
+_ADAM7 = (
+    (0, 0, 8, 8),
+    (4, 0, 8, 8),
+    (0, 4, 4, 8),
+    (2, 0, 4, 4),
+    (0, 2, 2, 4),
+    (1, 0, 2, 2),
+    (0, 1, 1, 2),
+)
+# Samples per pixel of each colour type.
+_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+
+class Pixels(NamedTuple):
+    """Decoded image as 8-bit samples, row by row from the top left."""
+
+    width: int
+    height: int
+    channels: int
+    """3 for RGB, or 4 for RGBA."""
+    data: bytes
+    """`width * height * channels` bytes, or a `memoryview` of them."""
+
+    @property
+    def stride(self):
+        """Bytes per row."""
+        return self.width * self.channels
+
+
+# Masks of the low 7 & high bit of each byte, by length in bytes.
+_MASKS: Dict[int, Tuple[int, int]] = {}
+
+
+def _add(x: bytes, y: bytes):
+    """Add `x` & `y` byte by byte, modulo 256.
+
+    Both are added as one big int with the carry out of each byte masked off, which
+    is far faster than looping over bytes.
+    """
+    n = len(x)
+    masks = _MASKS.get(n)
+    if masks is None:
+        masks = _MASKS[n] = (
+            int.from_bytes(b"\x7f" * n, "little"),
+            int.from_bytes(b"\x80" * n, "little"),
+        )
+    low, high = masks
+    a = int.from_bytes(x, "little")
+    b = int.from_bytes(y, "little")
+    s = ((a & low) + (b & low)) ^ ((a ^ b) & high)
+    return s.to_bytes(n, "little")
+
+
+def _sum8(a: int, b: int):
+    """Add modulo 256."""
+    return (a + b) & 255
+
+
+def _avg8(a: int, rb: Tuple[int, int]):
+    """Reconstruct Average filtered byte from left byte `a` & (raw, up) `rb`."""
+    return (rb[0] + ((a + rb[1]) >> 1)) & 255
+
+
+def _paeth8(a: int, rbc: Tuple[int, int, int]):
+    """Reconstruct Paeth filtered byte from left byte `a` & (raw, up, upleft)."""
+    r, b, c = rbc
+    pa = b - c if b > c else c - b
+    pb = a - c if a > c else c - a
+    pc = a + b - c - c
+    if pc < 0:
+        pc = -pc
+    if pa <= pb and pa <= pc:
+        return (r + a) & 255
+    if pb <= pc:
+        return (r + b) & 255
+    return (r + c) & 255
+
+
+def _unfilter(raw: bytes, stride: int, height: int, bpp: int):
+    """Reverse per-row filters of `height` rows of `stride` bytes.
+
+    Sub, Average & Paeth depend on the reconstructed byte to the left, so each is
+    run as an `accumulate()` over every `bpp`-th byte, one sample channel at a time.
+    """
+    out = bytearray(stride * height)
+    prev = bytes(stride)
+    pos = 0
+    for y in range(height):
+        ftype = raw[pos]
+        line = raw[pos + 1 : pos + 1 + stride]
+        pos += stride + 1
+        if ftype == 0:
+            pass
+        elif ftype == 1:
+            row = bytearray(line)
+            for c in range(bpp):
+                row[c::bpp] = bytes(accumulate(line[c::bpp], _sum8))
+            line = row
+        elif ftype == 2:
+            line = _add(line, prev)
+        elif ftype == 3:
+            row = bytearray(line)
+            for c in range(bpp):
+                acc = accumulate(zip(line[c::bpp], prev[c::bpp]), _avg8, initial=0)
+                next(acc)
+                row[c::bpp] = bytes(acc)
+            line = row
+        elif ftype == 4:
+            row = bytearray(line)
+            for c in range(bpp):
+                up = prev[c::bpp]
+                upleft = b"\0" + up[:-1]
+                acc = accumulate(zip(line[c::bpp], up, upleft), _paeth8, initial=0)
+                next(acc)
+                row[c::bpp] = bytes(acc)
+            line = row
+        else:
+            raise ValueError(f"Invalid PNG filter type: {ftype}")
+        out[y * stride : (y + 1) * stride] = line
+        prev = line
+    return out
+
+
+def _unpack_table(depth: int, scale: bool):
+    """Table of each byte of `depth`-bit samples unpacked to 1 byte per sample.
+
+    If `scale`, samples are scaled to 0-255, e.g. for grayscale.
+    """
+    per = 8 // depth
+    mask = (1 << depth) - 1
+    factor = 255 // mask if scale else 1
+    return [
+        bytes((v >> (8 - depth * (k + 1)) & mask) * factor for k in range(per))
+        for v in range(256)
+    ]
+
+
+def _samples(rows: bytearray, width: int, height: int, depth: int, scale: bool):
+    """Convert unfiltered rows to 8-bit samples."""
+    if depth == 8:
+        return rows
+    if depth == 16:
+        # Keep the high byte of each sample.
+        return rows[0::2]
+    table = _unpack_table(depth, scale)
+    stride = (width * depth + 7) // 8
+    return b"".join(
+        b"".join(map(table.__getitem__, rows[y * stride : (y + 1) * stride]))[:width]
+        for y in range(height)
+    )
+
+
+def _to_rgb(
+    samples: bytes,
+    n: int,
+    ctype: int,
+    palette: bytes,
+    alpha: bytes,
+):
+    """Convert `n` pixels of 8-bit samples of colour type `ctype` to RGB or RGBA.
+
+    Returns:
+        Tuple[int, bytes]: Number of channels & pixel data.
+    """
+    if ctype == 2 or ctype == 6:
+        return (3 if ctype == 2 else 4), bytes(samples)
+
+    if ctype == 3:
+        if not palette:
+            raise ValueError("PNG has no palette.")
+        # Look up each channel of the palette with `bytes.translate()`.
+        entries = len(palette) // 3
+        index = bytes(samples)
+        planes = [index.translate(palette[c::3].ljust(256, b"\0")) for c in range(3)]
+        if alpha:
+            planes.append(index.translate(alpha[:entries].ljust(256, b"\xff")))
+    else:
+        gray = samples[0::2] if ctype == 4 else samples
+        planes = [gray] * 3
+        if ctype == 4:
+            planes.append(samples[1::2])
+
+    channels = len(planes)
+    out = bytearray(n * channels)
+    for c, plane in enumerate(planes):
+        out[c::channels] = plane
+    return channels, bytes(out)
+
+
+def _chunks(data: bytes):
+    """Iterate over (type, body) of each chunk of PNG file `data`."""
+    if data[:8] != PNG_SIGNATURE:
+        raise ValueError("Not a PNG file.")
+    pos = 8
+    while pos + 8 <= len(data):
+        length, ctype = struct.unpack(">I4s", data[pos : pos + 8])
+        yield ctype, data[pos + 8 : pos + 8 + length]
+        pos += 12 + length
+        if ctype == b"IEND":
+            break
+
+
+def png_size(path: Union[str, Path]):
+    """Get (width, height) of PNG file from its header, without decoding it.
+
+    Raises:
+        OSError: If file cannot be read.
+        ValueError: If file is not a PNG.
+    """
+    with open(path, "rb") as f:
+        head = f.read(24)
+    if head[:8] != PNG_SIGNATURE or head[12:16] != b"IHDR":
+        raise ValueError(f"Not a PNG file: {path}")
+    width, height = struct.unpack(">II", head[16:24])
+    return width, height
+
+
+def decode_png(path: Union[str, Path]):
+    """Decode PNG file to 8-bit RGB or RGBA pixels. Safe to call from any thread.
+
+    All colour types, bit depths & interlacing are supported. Grayscale is expanded
+    to RGB, 16-bit samples are truncated to 8 bits, and only palette transparency
+    (tRNS) is kept, so the result can be uploaded with `to_photo()`.
+
+    Raises:
+        OSError: If file cannot be read.
+        ValueError: If file is not a valid PNG.
+
+    Returns:
+        Pixels: Decoded image.
+    """
+    data = Path(path).read_bytes()
+    header = None
+    palette = b""
+    alpha = b""
+    idat: List[bytes] = []
+    for ctype, body in _chunks(data):
+        if ctype == b"IHDR":
+            header = struct.unpack(">IIBBBBB", body)
+        elif ctype == b"PLTE":
+            palette = body
+        elif ctype == b"tRNS":
+            alpha = body
+        elif ctype == b"IDAT":
+            idat.append(body)
+    if header is None or not idat:
+        raise ValueError(f"Incomplete PNG file: {path}")
+
+    width, height, depth, ctype, _, _, interlace = header
+    if ctype not in _CHANNELS or depth not in (1, 2, 4, 8, 16):
+        raise ValueError(f"Unsupported PNG colour type {ctype}, bit depth {depth}.")
+    if ctype != 3:
+        # Colour key transparency of non-palette images is not supported.
+        alpha = b""
+    nsamples = _CHANNELS[ctype]
+    bits = depth * nsamples
+    bpp = max(bits // 8, 1)
+    try:
+        raw = zlib.decompress(b"".join(idat))
+    except zlib.error as e:
+        raise ValueError(f"Corrupt PNG file: {path}") from e
+
+    def _pass(pos: int, w: int, h: int):
+        """Decode `w * h` sub-image at offset `pos` of `raw` to 8-bit samples."""
+        stride = (w * bits + 7) // 8
+        rows = _unfilter(raw[pos:], stride, h, bpp)
+        end = pos + (stride + 1) * h
+        return end, _samples(rows, w * nsamples, h, depth, ctype != 3)
+
+    if not interlace:
+        _, samples = _pass(0, width, height)
+    else:
+        out = bytearray(width * height * nsamples)
+        rowlen = width * nsamples
+        pos = 0
+        for xs, ys, dx, dy in _ADAM7:
+            w = (width - xs + dx - 1) // dx
+            h = (height - ys + dy - 1) // dy
+            if w <= 0 or h <= 0:
+                continue
+            pos, sub = _pass(pos, w, h)
+            # Scatter each sample channel of each row into place.
+            sublen = w * nsamples
+            for i, y in enumerate(range(ys, height, dy)):
+                row = sub[i * sublen : (i + 1) * sublen]
+                base = y * rowlen + xs * nsamples
+                for c in range(nsamples):
+                    out[base + c : (y + 1) * rowlen : dx * nsamples] = row[c::nsamples]
+        samples = out
+
+    channels, pixels = _to_rgb(samples, width * height, ctype, palette, alpha)
+    return Pixels(width, height, channels, pixels)
+
+
+def _chunk(ctype: bytes, body: bytes):
+    """Encode PNG chunk."""
+    crc = zlib.crc32(body, zlib.crc32(ctype))
+    return struct.pack(">I", len(body)) + ctype + body + struct.pack(">I", crc)
+
+
+def encode_png(pixels: Pixels, level: int = 0):
+    """Encode `pixels` as a PNG file without filtering.
+
+    Defaults to compression `level` 0, which is quickest to both encode & decode,
+    for handing pixels to Tk rather than saving them.
+    """
+    w, h, channels, data = pixels
+    stride = pixels.stride
+    raw = b"".join(b"\0" + data[y * stride : (y + 1) * stride] for y in range(h))
+    ctype = 6 if channels == 4 else 2
+    return b"".join(
+        (
+            PNG_SIGNATURE,
+            _chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, ctype, 0, 0, 0)),
+            _chunk(b"IDAT", zlib.compress(raw, level)),
+            _chunk(b"IEND", b""),
+        )
+    )
+
+
+def opaque(pixels: Pixels):
+    """Drop the alpha channel of RGBA `pixels` if every pixel is opaque."""
+    w, h, channels, data = pixels
+    if channels != 4 or data[3::4].strip(b"\xff"):
+        return pixels
+    rgb = bytearray(w * h * 3)
+    for c in range(3):
+        rgb[c::3] = data[c::4]
+    return Pixels(w, h, 3, bytes(rgb))
+
+
+def to_ppm(pixels: Pixels):
+    """Encode RGB `pixels` as a binary PPM file, or an RGBA PNG if translucent.
+
+    Opaque RGBA pixels have their alpha channel dropped so they can be PPM too.
+
+    Returns:
+        Tuple[bytes, str]: File data & its Tk photo format name.
+    """
+    pixels = opaque(pixels)
+    if pixels.channels == 4:
+        return encode_png(pixels), "png"
+    return b"P6\n%d %d\n255\n" % pixels[:2] + pixels.data, "ppm"
+
+
+def to_photo(master, pixels: Pixels):
+    """Upload `pixels` to a new `tk.PhotoImage`. Must be called on the Tk thread.
+
+    Args:
+        master (tk.Misc): Any widget of the Tk app.
+        pixels (Pixels): Decoded image.
+
+    Returns:
+        tk.PhotoImage: Image.
+    """
+    import tkinter as tk
+
+    data, fmt = to_ppm(pixels)
+    return tk.PhotoImage(master=master, data=data, format=fmt)
+
+
+# Time decoding every asset, checking against Tk's own decoder if it can be loaded.
+if __name__ == "__main__":
+    import time
+
+    from .utils import ASSETS_DIR
+
+    for fp in sorted(ASSETS_DIR.glob("*.png")):
+        start = time.perf_counter()
+        img = decode_png(fp)
+        dt = (time.perf_counter() - start) * 1e3
+        start = time.perf_counter()
+        data, fmt = to_ppm(img)
+        dt_enc = (time.perf_counter() - start) * 1e3
+        print(
+            f"{fp.name:>24}: {img.width}x{img.height}x{img.channels},"
+            f" decode {dt:6.1f} ms, {fmt} {dt_enc:5.1f} ms"
+        )
@@ -0,0 +1,267 @@
+"""Event-driven Tkinter update pump for asyncio."""
+
+import asyncio
+import logging
+import selectors
+import tkinter as tk
+import weakref
+from math import ceil
+from typing import Any, Callable, List, Optional
+
+from _tkinter import ALL_EVENTS, DONT_WAIT, READABLE
+
+from .utils import IDLE_WAIT, LOOP_WAIT
+
+__all__ = ["TkPump", "TkSelector", "get_pump", "new_event_loop"]
+
+log = logging.getLogger(__name__)
+
+
+def _drain(interp: Any, max_events: int):
+    """Process up to `max_events` pending Tk events without blocking."""
+    n = 0
+    while n < max_events and interp.dooneevent(ALL_EVENTS | DONT_WAIT):
+        n += 1
+    return n
+
+
+class TkSelector(selectors.BaseSelector):
+    """Selector that makes asyncio wait inside Tk's event loop.
+
+    Wraps the default selector. Whenever asyncio would block in `select()` with a
+    Tk interpreter attached, it blocks in Tk's `dooneevent()` instead, with the
+    wrapped selector's fd registered as a Tk file handler & a Tk timer armed for
+    asyncio's next scheduled callback. Whichever of a window event, ready fd (incl.
+    `call_soon_threadsafe()`) or timer comes first wakes both loops, so an idle app
+    sleeps until there is work without polling.
+
+    Pending Tk events are also processed on every loop iteration, so input is
+    handled immediately even while asyncio is busy.
+    """
+
+    def __init__(self, max_events: int = 10000):
+        """Create selector.
+
+        Args:
+            max_events (int, optional): Most Tk events processed per loop
+                iteration, so self-rescheduling callbacks cannot starve asyncio.
+                Defaults to 10000.
+        """
+        self.max_events = max_events
+        self.interp: Optional[Any] = None
+        """Tk interpreter to wait in, or None to wait in the wrapped selector."""
+        self.waits = 0
+        """Number of times asyncio blocked, for profiling."""
+        self._selector = selectors.DefaultSelector()
+
+    def attach(self, root: Optional[tk.Misc]):
+        """Wait in Tk event loop of `root`, or stop waiting in Tk if None.
+
+        Has no effect where Tk can't watch fds (Windows), leaving `TkPump` to poll.
+
+        Returns:
+            bool: Whether asyncio now waits in Tk.
+        """
+        interp = None if root is None else root.tk
+        fileno = getattr(self._selector, "fileno", None)
+        if fileno is None or not hasattr(interp, "createfilehandler"):
+            interp = None
+        self.interp = interp
+        return interp is not None
+
+    def register(self, fileobj, events, data=None):
+        """Register file object with wrapped selector."""
+        return self._selector.register(fileobj, events, data)
+
+    def unregister(self, fileobj):
+        """Unregister file object from wrapped selector."""
+        return self._selector.unregister(fileobj)
+
+    def modify(self, fileobj, events, data=None):
+        """Change events watched for file object."""
+        return self._selector.modify(fileobj, events, data)
+
+    def get_map(self):
+        """Get mapping of file objects to keys."""
+        return self._selector.get_map()
+
+    def close(self):
+        """Close wrapped selector."""
+        self.interp = None
+        self._selector.close()
+
+    def select(self, timeout: Optional[float] = None):
+        """Wait up to `timeout` seconds for ready fds, processing Tk events."""
+        interp = self.interp
+        if interp is None:
+            return self._selector.select(timeout)
+        # Tk callbacks may schedule asyncio callbacks, so don't block after any.
+        handled = _drain(interp, self.max_events)
+        ready = self._selector.select(0)
+        if handled or ready or (timeout is not None and timeout <= 0):
+            return ready
+
+        self.waits += 1
+        fd = self._selector.fileno()  # type: ignore[attr-defined]
+        interp.createfilehandler(fd, READABLE, lambda *_: None)
+        timer = None
+        if timeout is not None:
+            timer = interp.call("after", max(ceil(timeout * 1000), 1), "")
+        try:
+            interp.dooneevent(ALL_EVENTS)
+        finally:
+            interp.deletefilehandler(fd)
+            if timer is not None:
+                interp.call("after", "cancel", timer)
+        _drain(interp, self.max_events)
+        return self._selector.select(0)
+
+
+_SELECTORS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, TkSelector]" = (
+    weakref.WeakKeyDictionary()
+)
+"""`TkSelector` of each event loop made by `new_event_loop()`."""
+
+
+def new_event_loop():
+    """Create asyncio event loop that waits in Tk's event loop, see `TkSelector`.
+
+    Pass as `loop_factory` to `asyncio.Runner`. A `TkPump` run on it attaches its
+    root to the selector, so the pump no longer has to poll for Tk events.
+    """
+    selector = TkSelector()
+    loop = asyncio.SelectorEventLoop(selector)
+    _SELECTORS[loop] = selector
+    return loop
+
+
+class TkPump:
+    """Pumps Tkinter events from within the asyncio event loop.
+
+    Instead of calling `root.update()` at a fixed 60Hz, each frame runs
+    `frame_callbacks` & drains all pending Tk events. Asyncio code that changes
+    widgets should call `wake()` so the change is drawn immediately.
+
+    On an event loop from `new_event_loop()`, asyncio itself waits in Tk's event
+    loop, see `TkSelector`. Tk events are then handled as they arrive & frames only
+    run on `wake()`, so an idle app doesn't wake up at all.
+
+    Otherwise (e.g. `asyncio.run()`, or on Windows), Tk can't wake asyncio on window
+    events, so the pump polls: it sleeps until `wake()` or a timeout that doubles
+    every idle frame from `min_wait` up to `max_wait`, and resets to `min_wait` as
+    soon as Tk has work again. User input while idle is then picked up within
+    `max_wait`, trading input latency for fewer idle wakeups.
+    """
+
+    def __init__(
+        self,
+        root: tk.Misc,
+        min_wait: float = LOOP_WAIT,
+        max_wait: float = IDLE_WAIT,
+        max_events: int = 10000,
+    ):
+        """Create pump.
+
+        Args:
+            root (tk.Misc): Root Tkinter widget, or a bare `tk.Tcl()` interpreter.
+            min_wait (float, optional): Wait between frames when polling & busy.
+                Defaults to `LOOP_WAIT`.
+            max_wait (float, optional): Longest wait between frames when polling &
+                idle. Defaults to `IDLE_WAIT`.
+            max_events (int, optional): Most events processed per frame, so
+                self-rescheduling callbacks cannot starve asyncio. Defaults to 10000.
+        """
+        self.root = root
+        self.min_wait = min_wait
+        self.max_wait = max_wait
+        self.max_events = max_events
+        self.running = False
+        self.wakeups = 0
+        """Number of frames pumped so far, for profiling."""
+        self.frame_callbacks: List[Callable[[], Any]] = []
+        """Functions called at the start of every frame, before Tk events."""
+        self._wake = asyncio.Event()
+
+    def wake(self):
+        """Pump on the next loop iteration. Must be called on the loop's thread."""
+        self._wake.set()
+
+    def stop(self):
+        """Stop `run()` after the current frame."""
+        self.running = False
+        self._wake.set()
+
+    def drain(self):
+        """Process all pending Tk events without blocking.
+
+        Returns:
+            int: Number of events processed.
+        """
+        return _drain(self.root.tk, self.max_events)
+
+    async def run(self):
+        """Pump Tk events until `stop()` is called."""
+        self.running = True
+        selector = _SELECTORS.get(asyncio.get_running_loop())
+        blocking = selector is not None and selector.attach(self.root)
+        wait = self.min_wait
+        try:
+            while self.running:
+                self.wakeups += 1
+                self._wake.clear()
+                for callback in self.frame_callbacks:
+                    callback()
+                if self.drain():
+                    wait = self.min_wait
+                else:
+                    wait = min(wait * 2, self.max_wait)
+
+                if blocking:
+                    # Tk events are handled by the selector while asyncio waits.
+                    await self._wake.wait()
+                    continue
+                try:
+                    async with asyncio.timeout(wait):
+                        await self._wake.wait()
+                except TimeoutError:
+                    pass
+        finally:
+            if blocking:
+                selector.attach(None)  # type: ignore[union-attr]
+
+
+def get_pump(widget: tk.Misc):
+    """Add/retrieve the `TkPump` of the root of `widget`."""
+    root = widget._root() if isinstance(widget, tk.Misc) else widget
+    pump = getattr(root, "pump", None)
+    if pump is None:
+        pump = TkPump(root)
+        setattr(root, "pump", pump)
+    return pump
+
+
+# Measure idle cost of pump. Uses a bare Tcl interpreter, so no display is needed.
+if __name__ == "__main__":
+    import time
+
+    IDLE_SECS = 5.0
+
+    async def _measure(pump: TkPump):
+        """Run pump while idle & report wakeups and CPU time."""
+        task = asyncio.create_task(pump.run())
+        selector = _SELECTORS.get(asyncio.get_running_loop())
+        waits = 0 if selector is None else selector.waits
+        cpu, wall = time.process_time(), time.perf_counter()
+        await asyncio.sleep(IDLE_SECS)
+        cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+        if selector is not None:
+            waits = selector.waits - waits
+        pump.stop()
+        await task
+        return max(pump.wakeups, waits) / wall, 100 * cpu / wall
+
+    interp = tk.Tcl()
+    for name, factory in (("polling", None), ("Tk waits", new_event_loop)):
+        with asyncio.Runner(loop_factory=factory) as runner:
+            rate, cpu = runner.run(_measure(TkPump(interp)))
+        print(f"{name:>10}: {rate:6.1f} wakeups/s, {cpu:.3f}% CPU")
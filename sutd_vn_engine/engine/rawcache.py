@@ -0,0 +1,170 @@
+"""On-disk cache of decoded & resized images in raw PPM/PAM format."""
+
+import hashlib
+import logging
+import mmap
+import os
+import threading
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+from .png import Pixels, opaque
+from .utils import CACHE_DIR
+
+__all__ = ["RawCache"]
+
+log = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+"""Bumped whenever the cached format or decoding changes, to invalidate the cache."""
+
+
+def _header(pixels: Pixels):
+    """Get PPM header for RGB `pixels`, or PAM header for RGBA."""
+    w, h, channels, _ = pixels
+    if channels == 3:
+        return b"P6\n%d %d\n255\n" % (w, h)
+    return (
+        b"P7\nWIDTH %d\nHEIGHT %d\nDEPTH 4\nMAXVAL 255\nTUPLTYPE RGB_ALPHA\nENDHDR\n"
+        % (w, h)
+    )
+
+
+def _parse(data: Union[bytes, mmap.mmap]):
+    """Parse header written by `_header()`.
+
+    Returns:
+        Tuple[int, int, int, int]: Width, height, channels & offset of pixel data.
+    """
+    if data[:3] == b"P6\n":
+        end = data.find(b"\n", data.find(b"\n", 3) + 1) + 1
+        w, h = map(int, data[3:end].split()[:2])
+        return w, h, 3, end
+    if data[:3] == b"P7\n":
+        end = data.find(b"ENDHDR\n") + 7
+        fields = dict(line.split(b" ", 1) for line in data[3 : end - 7].splitlines())
+        return int(fields[b"WIDTH"]), int(fields[b"HEIGHT"]), 4, end
+    raise ValueError("Not a PPM or PAM file.")
+
+
+class RawCache:
+    """Decoded images stored on disk, keyed by a hash of their source file.
+
+    Opaque images are stored as binary PPM & translucent ones as PAM, which are
+    just a short header followed by the raw pixels, so loading them is a memory map
+    instead of a decode. Entries are keyed by the contents of the source file, the
+    size it was resized to & the filter used, so editing an asset or changing the
+    screen resolution misses the cache. Entries are evicted least recently used
+    first once the cache exceeds `budget` bytes.
+    """
+
+    def __init__(self, path: Union[str, Path] = CACHE_DIR / "images", budget=2**28):
+        """Create cache. Nothing is written until an image is saved.
+
+        Args:
+            path (Union[str, Path], optional): Cache folder. Defaults to "images" in
+                `CACHE_DIR`.
+            budget (int, optional): Most bytes of images kept. Defaults to 256 MiB.
+        """
+        self.path = Path(path)
+        self.budget = budget
+
+    def entry(
+        self,
+        img_fp: Union[str, Path],
+        size: Optional[Tuple[int, int]] = None,
+        filter: str = "",
+        source_digest: Optional[str] = None,
+    ):
+        """Get path of cache entry for `img_fp` resized to `size` with `filter`.
+
+        `source_digest` is a hash of `img_fp` if already known, else it is read.
+
+        Raises:
+            OSError: If `img_fp` cannot be read.
+        """
+        if source_digest is None:
+            digest = hashlib.sha256(Path(img_fp).read_bytes())
+        else:
+            digest = hashlib.sha256(source_digest.encode())
+        tag = "orig" if size is None else f"{size[0]}x{size[1]}"
+        digest.update(f"\0{tag}\0{filter if size else ''}\0{FORMAT_VERSION}".encode())
+        return self.path / f"{Path(img_fp).stem}.{tag}.{digest.hexdigest()[:32]}.pxm"
+
+    def load(self, entry: Path) -> Optional[Pixels]:
+        """Memory-map image at `entry`, or None if it isn't cached.
+
+        The pixels of opaque images are a view of the mapped file, which stays open
+        until they are garbage collected.
+        """
+        try:
+            with open(entry, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            w, h, channels, offset = _parse(mm)
+            if len(mm) - offset != w * h * channels:
+                raise ValueError("Truncated file.")
+            # Mark as recently used.
+            os.utime(entry)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            log.warning(f"Dropping corrupt cached image {entry}: {e}")
+            entry.unlink(missing_ok=True)
+            return None
+        data = memoryview(mm)[offset:]
+        # Translucent images are re-encoded by `to_photo()`, which needs `bytes`.
+        return Pixels(w, h, channels, data if channels == 3 else bytes(data))
+
+    def save(self, entry: Path, pixels: Pixels):
+        """Store `pixels` at `entry`, then evict old entries if over budget."""
+        pixels = opaque(pixels)
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+            # Worker threads may save the same entry at once.
+            tmp_fp = entry.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_fp, "wb") as f:
+                f.write(_header(pixels))
+                f.write(pixels.data)
+            os.replace(tmp_fp, entry)
+        except OSError as e:
+            log.warning(f"Failed to cache image {entry}: {e}")
+            return
+        self.prune()
+
+    def prune(self):
+        """Delete least recently used entries until within budget."""
+        try:
+            entries = [(fp.stat(), fp) for fp in self.path.glob("*.pxm")]
+        except OSError:
+            return
+        total = sum(st.st_size for st, _ in entries)
+        for st, fp in sorted(entries, key=lambda e: e[0].st_mtime):
+            if total <= self.budget:
+                break
+            try:
+                fp.unlink()
+                total -= st.st_size
+            except OSError as e:
+                # E.g. still mapped on Windows.
+                log.debug(f"Failed to evict cached image {fp}: {e}")
+
+
+# Time loading every asset from PNG vs from the cache.
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    from .png import decode_png
+    from .utils import ASSETS_DIR
+
+    cache = RawCache(tempfile.mkdtemp(prefix="sutd_vn_rawcache_"))
+    for fp in sorted(ASSETS_DIR.glob("*.png")):
+        start = time.perf_counter()
+        img = decode_png(fp)
+        dt_png = (time.perf_counter() - start) * 1e3
+        cache.save(cache.entry(fp), img)
+        start = time.perf_counter()
+        cached = cache.load(cache.entry(fp))
+        dt_raw = (time.perf_counter() - start) * 1e3
+        assert cached is not None and bytes(cached.data) == opaque(img).data
+        print(f"{fp.name:>24}: png {dt_png:6.1f} ms, cached {dt_raw:5.2f} ms")
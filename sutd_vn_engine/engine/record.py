@@ -0,0 +1,220 @@
+"""Record play sessions to a file & replay them.
+
+Sessions are stored as JSON lines. The first line is a header, e.g.
+`{"version": 1, "start": 1700000000.0}`, followed by one line per `Controller` call
+as `[time, kind, *args]`, where `time` is seconds since the start:
+
+```
+[0.0, "speaker", "You", "right"]
+[0.0, "face", "background"]
+[1.234, "print", "Hello world."]
+[5.678, "input", "What is your name?", "Bob"]
+```
+"""
+
+import asyncio
+import functools
+import inspect
+import json
+import logging
+import time
+from pathlib import Path
+from typing import IO, Any, Callable, List, Tuple, TypeVar, Union
+
+from .app import AsyncController, Controller
+
+__all__ = ["Recorder", "load_session", "Replayer"]
+
+log = logging.getLogger(__name__)
+
+RECORD_VERSION = 1
+"""Bumped whenever the session format changes."""
+
+C = TypeVar("C", Controller, AsyncController)
+
+
+class Recorder:
+    """Streams calls made to a `Controller` to a session file."""
+
+    def __init__(self, path: Union[str, Path]):
+        """Create session file at `path`, overwriting it."""
+        self.path = Path(path)
+        self.start = time.monotonic()
+        self._file: IO[str] = open(self.path, "w", encoding="utf-8", buffering=1)
+        self._write({"version": RECORD_VERSION, "start": time.time()})
+
+    def _write(self, obj: Any):
+        """Write `obj` as one line."""
+        self._file.write(json.dumps(obj, ensure_ascii=False, separators=(",", ":")))
+        self._file.write("\n")
+
+    def log(self, kind: str, *args):
+        """Record event now."""
+        if not self._file.closed:
+            self._write([round(time.monotonic() - self.start, 3), kind, *args])
+
+    def wrap(self, G: C) -> C:
+        """Get copy of `G` that records every call. Works with `AsyncController` too.
+
+        Events are recorded when calls return, so `print` is timed after its
+        animation & `input` after the reply.
+        """
+
+        def _wrap(fn: Callable, kind: str, reply: bool = False):
+            """Wrap `fn` to record its arguments, and its return value if `reply`."""
+
+            def _log(args: tuple, kwargs: dict, ret: Any):
+                """Record call."""
+                if kind == "print":
+                    # Only the joined text is recorded.
+                    args = (kwargs.get("sep", " ").join(map(str, args)),)
+                self.log(kind, *args, *((ret,) if reply else ()))
+
+            if inspect.iscoroutinefunction(fn):
+
+                @functools.wraps(fn)
+                async def _awrapper(*args, **kwargs):
+                    """Call `fn` & record it."""
+                    ret = await fn(*args, **kwargs)
+                    _log(args, kwargs, ret)
+                    return ret
+
+                return _awrapper
+
+            @functools.wraps(fn)
+            def _wrapper(*args, **kwargs):
+                """Call `fn` & record it."""
+                ret = fn(*args, **kwargs)
+                _log(args, kwargs, ret)
+                return ret
+
+            return _wrapper
+
+        def _jumpscare():
+            """Record jumpscare before it quits the game."""
+            self.log("jumpscare")
+            return G.show_jumpscare()
+
+        return G._replace(
+            input=_wrap(G.input, "input", reply=True),
+            print=_wrap(G.print, "print"),
+            set_speaker=_wrap(G.set_speaker, "speaker"),
+            show_face=_wrap(G.show_face, "face"),
+            show_bg=_wrap(G.show_bg, "bg"),
+            show_jumpscare=_jumpscare,
+        )
+
+    def close(self):
+        """Close session file."""
+        self._file.close()
+
+    def __enter__(self):
+        """Use as context manager."""
+        return self
+
+    def __exit__(self, *_):
+        """Close session file on exit."""
+        self.close()
+
+
+def load_session(path: Union[str, Path]):
+    """Load session recorded by `Recorder`.
+
+    Raises:
+        ValueError: If file is not a session, or is of a different version.
+
+    Returns:
+        List[list]: Events as `[time, kind, *args]`.
+    """
+    with open(path, encoding="utf-8") as f:
+        header = json.loads(f.readline() or "null")
+        if not isinstance(header, dict) or header.get("version") != RECORD_VERSION:
+            raise ValueError(f"{path} is not a version {RECORD_VERSION} session.")
+        events: List[list] = []
+        for line in f:
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError:
+                # Last line may be cut off if the game was killed mid-write.
+                log.warning(f"Skipping corrupt line in {path}: {line!r}")
+        return events
+
+
+class Replayer:
+    """Feeds recorded `input()` replies back to a story.
+
+    Use as the `replies` of `run_headless()`, or `wrap()` a `Controller` so its
+    `input()` answers from the session instead of waiting for the player.
+    """
+
+    def __init__(self, path: Union[str, Path], realtime: bool = False):
+        """Load session.
+
+        Args:
+            path (Union[str, Path]): Session file from `Recorder`.
+            realtime (bool, optional): Whether to wait till each reply's recorded
+                time, counted from when the replayer is created, before replying.
+                Else reply immediately. Defaults to False.
+        """
+        self.replies: List[Tuple[float, str, str]] = [
+            (e[0], e[2], e[3]) for e in load_session(path) if e[1] == "input"
+        ]
+        """(Time, prompt, reply) of each recorded `input()`."""
+        self.realtime = realtime
+        self.index = 0
+        """Index of next reply."""
+        self.start = time.monotonic()
+
+    def _next(self, prompt: str):
+        """Get (seconds to wait, reply) for `prompt`."""
+        if self.index >= len(self.replies):
+            raise EOFError(f"No recorded reply for prompt: {prompt}")
+        t, recorded, reply = self.replies[self.index]
+        if prompt != recorded:
+            log.warning(
+                f"Replay diverged at reply {self.index}: expected prompt"
+                f" {recorded!r}, got {prompt!r}."
+            )
+        self.index += 1
+        wait = self.start + t - time.monotonic() if self.realtime else 0.0
+        return wait, reply
+
+    def __call__(self, prompt: str):
+        """Reply to `prompt`, blocking till its recorded time if realtime."""
+        wait, reply = self._next(prompt)
+        if wait > 0:
+            time.sleep(wait)
+        return reply
+
+    def wrap(self, G: C) -> C:
+        """Get copy of `G` whose `input()` replies from the session.
+
+        If `G` has a GUI, prompts are still shown & replies are typed into it with
+        `G.enter()`, so the replay goes through the same widgets as the player.
+        """
+        enter = G.enter
+        if inspect.iscoroutinefunction(G.input):
+            ainput = G.input
+
+            async def _ainput(__prompt: object = "", /):
+                """Reply from session."""
+                wait, reply = self._next(str(__prompt))
+                if enter is not None:
+                    enter(reply, max(wait, 0.0))
+                    return await ainput(__prompt)
+                await asyncio.sleep(wait)
+                return reply
+
+            return G._replace(input=_ainput)
+
+        sinput = G.input
+
+        def _input(__prompt: object = "", /):
+            """Reply from session."""
+            if enter is not None:
+                wait, reply = self._next(str(__prompt))
+                enter(reply, max(wait, 0.0))
+                return sinput(__prompt)
+            return self(str(__prompt))
+
+        return G._replace(input=_input)
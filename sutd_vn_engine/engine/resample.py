@@ -0,0 +1,120 @@
+"""Resize decoded images by any factor, using only the standard library."""
+
+from math import gcd
+from typing import List, Tuple
+
+from .png import Pixels
+
+__all__ = ["FILTERS", "resize", "scaled_size"]
+
+FILTERS = ("nearest", "box")
+"""Supported resampling filters. "box" is smoother when downscaling, but takes
+about 5x as long, e.g. 250 ms instead of 50 ms for 4096 to 1920 px wide."""
+
+
+def scaled_size(size: Tuple[int, int], scale: float):
+    """Size of an image of `size` scaled by `scale`, at least 1x1 px."""
+    return max(round(size[0] * scale), 1), max(round(size[1] * scale), 1)
+
+
+def _taps(src: int, dst: int, box: bool):
+    """Get number of source pixels averaged per output pixel.
+
+    A box filter averages the `round(src / dst)` pixels around each output pixel,
+    up to 16, so downscaling by 2.13 averages 2x2 pixels. Upscaling takes the
+    nearest pixel.
+    """
+    return min(max(round(src / dst), 1), 16) if box else 1
+
+
+def _starts(src: int, dst: int, taps: int):
+    """Get first of `taps` source pixels centred on each output pixel.
+
+    Computed exactly, so the result is periodic: if `src / dst` is `P / Q` in
+    lowest terms, `starts[i + Q] == starts[i] + P`.
+    """
+    return [((2 * i + 1) * src - (taps - 1) * dst) // (2 * dst) for i in range(dst)]
+
+
+def _tables(n: int):
+    """Get table per tap dividing bytes by `n`, such that the `n` are summed exactly.
+
+    Each tap `t` maps `v` to `(v + t) // n`, which sum to `v` if all taps are `v`,
+    and never to over 255, so taps can be summed as big ints without carries.
+    """
+    return [bytes((v + t) // n for v in range(256)) for t in range(n)]
+
+
+def resize(pixels: Pixels, width: int, height: int, filter: str = "nearest"):
+    """Resize `pixels` to `width` x `height`. Safe to call from any thread.
+
+    Rows are picked with one slice each, then columns with one extended slice over
+    the whole image per output column in a period, see `_starts()`, so no Python
+    code runs per pixel. For "box", each tap under the output pixels is picked the
+    same way, divided by the number of taps with `bytes.translate()`, and all taps
+    are summed as big ints.
+
+    Args:
+        pixels (Pixels): Image to resize.
+        width (int): Output width.
+        height (int): Output height.
+        filter (str, optional): One of `FILTERS`. Defaults to "nearest".
+
+    Returns:
+        Pixels: Resized image.
+    """
+    if filter not in FILTERS:
+        raise ValueError(f"Unknown filter {filter!r}, expected one of {FILTERS}.")
+    src_w, src_h, ch, data = pixels
+    if (width, height) == (src_w, src_h):
+        return pixels
+    box = filter == "box"
+    kx = _taps(src_w, width, box)
+    ky = _taps(src_h, height, box)
+    stride = src_w * ch
+    ys = _starts(src_h, height, ky)
+    # Rows under each output row, for each vertical tap.
+    rows: List[bytes] = [
+        b"".join([data[(y + t) * stride : (y + t + 1) * stride] for y in ys])
+        for t in range(ky)
+    ]
+
+    g = gcd(src_w, width)
+    p, q = src_w // g, width // g
+    step = p * ch
+    n = height * g
+    """Output samples per column & channel in a period."""
+    tables = _tables(kx * ky)
+    out = bytearray(width * height * ch)
+    for i, x in enumerate(_starts(src_w, width, kx)[:q]):
+        for c in range(ch):
+            if kx == ky == 1:
+                col = rows[0][x * ch + c :: step]
+            else:
+                total = 0
+                for t, row in enumerate(rows):
+                    for u in range(kx):
+                        tap = row[(x + u) * ch + c :: step]
+                        total += int.from_bytes(
+                            tap.translate(tables[t * kx + u]), "little"
+                        )
+                col = total.to_bytes(n, "little")
+            out[i * ch + c :: q * ch] = col
+    return Pixels(width, height, ch, bytes(out))
+
+
+# Time resizing the desktop background to common screen widths.
+if __name__ == "__main__":
+    import time
+
+    from .png import decode_png
+    from .utils import ASSETS_DIR
+
+    src = decode_png(ASSETS_DIR / "windoes_background.png")
+    for width in (1280, 1366, 1920, 2560, 3840, 8192):
+        size = scaled_size((src.width, src.height), width / src.width)
+        for filter in FILTERS:
+            start = time.perf_counter()
+            out = resize(src, *size, filter)
+            dt = (time.perf_counter() - start) * 1e3
+            print(f"{width:>5} wide, {filter:>7}: {dt:6.1f} ms")
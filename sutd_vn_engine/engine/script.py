@@ -0,0 +1,436 @@
+r"""Story script format, compiler & interpreter.
+
+Scripts are plain text, one statement per line. A line ending with `\` continues
+on the next line, joined by a single space. Text may include flags as `{FLAG}`.
+
+```
+# Comment.
+label NAME                  Jump target.
+speaker SIDE [NAME]         Set speaker, SIDE is "left", "right" or "center".
+say TEXT                    Print TEXT.
+face IMAGE                  Show face image from assets.
+bg IMAGE                    Show background image from assets.
+prompt FLAG TEXT            Ask TEXT & store reply in FLAG.
+ask FLAG TEXT               Ask TEXT until reply is y/n & store True/False in FLAG.
+set FLAG VALUE              Set FLAG to true, false, none or text.
+if FLAG goto NAME           Jump to label NAME if FLAG is truthy.
+ifnot FLAG goto NAME        Jump to label NAME if FLAG is falsy.
+goto NAME                   Jump to label NAME.
+end                         Stop script.
+```
+
+Scripts compile to a tuple of instructions `(opcode, *args)` with labels resolved
+to instruction indices. Compiled scripts are cached in `CACHE_DIR`, keyed by a hash
+of their source, so only changed scripts are parsed again.
+"""
+
+import hashlib
+import json
+import logging
+import marshal
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
+
+from .app import Controller
+from .utils import CACHE_DIR
+
+__all__ = [
+    "Program",
+    "ScriptError",
+    "Checkpoint",
+    "Interpreter",
+    "compile_script",
+    "load_script",
+    "program_digest",
+    "run_script",
+]
+
+log = logging.getLogger(__name__)
+
+Program = Tuple[Tuple[Any, ...], ...]
+"""Compiled script, a tuple of `(opcode, *args)` instructions."""
+
+FORMAT_VERSION = 1
+"""Bumped whenever the compiled format changes, to invalidate the cache."""
+SAVE_VERSION = 1
+"""Bumped whenever the save format changes."""
+
+# Opcodes.
+OP_SPEAKER = 0
+OP_PRINT = 1
+OP_PROMPT = 2
+OP_BRANCH = 3
+OP_FACE = 4
+OP_GOTO = 5
+OP_BG = 6
+OP_SET = 7
+OP_END = 8
+
+SIDES = ("left", "right", "center")
+VALUES = {"true": True, "false": False, "none": None}
+FLAG_RE = re.compile(r"\{(\w+)\}")
+
+
+class ScriptError(ValueError):
+    """Syntax error in a story script."""
+
+    def __init__(self, msg: str, filename: str, lineno: int):
+        """Create error pointing at `lineno` of `filename`."""
+        super(ScriptError, self).__init__(f"{filename}:{lineno}: {msg}")
+        self.filename = filename
+        self.lineno = lineno
+
+
+def _logical_lines(source: str):
+    """Yield (line number, line) of `source`, joining continued lines."""
+    buf: List[str] = []
+    start = 0
+    for lineno, line in enumerate(source.splitlines(), 1):
+        if not buf:
+            start = lineno
+        line = line.strip()
+        if line.endswith("\\"):
+            buf.append(line[:-1].strip())
+            continue
+        buf.append(line)
+        yield start, " ".join(buf)
+        buf = []
+    if buf:
+        yield start, " ".join(buf)
+
+
+def compile_script(source: str, filename: str = "<script>"):
+    """Compile script `source` to a `Program`.
+
+    Args:
+        source (str): Script source.
+        filename (str, optional): Name used in error messages. Defaults to
+            "<script>".
+
+    Raises:
+        ScriptError: If the script is invalid.
+
+    Returns:
+        Program: Compiled script.
+    """
+    program: List[list] = []
+    labels: Dict[str, int] = {}
+    # (instruction index, label, line number) to resolve after all labels are seen.
+    jumps: List[Tuple[int, str, int]] = []
+
+    for lineno, line in _logical_lines(source):
+        if not line or line.startswith("#"):
+            continue
+        op, _, rest = line.partition(" ")
+        rest = rest.strip()
+
+        def _error(msg: str):
+            """Raise error for current line."""
+            return ScriptError(msg, filename, lineno)
+
+        def _split(n: int, what: str):
+            """Split `rest` into exactly `n` words."""
+            args = rest.split(None, n - 1)
+            if len(args) != n:
+                raise _error(f"Expected `{op} {what}`.")
+            return args
+
+        if op == "label":
+            (name,) = _split(1, "NAME")
+            if name in labels:
+                raise _error(f"Duplicate label `{name}`.")
+            labels[name] = len(program)
+        elif op == "speaker":
+            side, _, name = rest.partition(" ")
+            if side not in SIDES:
+                raise _error(f"Side must be one of {', '.join(SIDES)}.")
+            program.append([OP_SPEAKER, name.strip(), side])
+        elif op == "say":
+            program.append([OP_PRINT, rest])
+        elif op in ("face", "bg"):
+            (img,) = _split(1, "IMAGE")
+            program.append([OP_FACE if op == "face" else OP_BG, img])
+        elif op in ("prompt", "ask"):
+            flag, text = _split(2, "FLAG TEXT")
+            program.append([OP_PROMPT, flag, text, op == "ask"])
+        elif op == "set":
+            flag, value = _split(2, "FLAG VALUE")
+            program.append([OP_SET, flag, VALUES.get(value.lower(), value)])
+        elif op in ("if", "ifnot"):
+            flag, kw, name = _split(3, "FLAG goto NAME")
+            if kw != "goto":
+                raise _error(f"Expected `{op} FLAG goto NAME`.")
+            jumps.append((len(program), name, lineno))
+            program.append([OP_BRANCH, flag, op == "ifnot", name])
+        elif op == "goto":
+            (name,) = _split(1, "NAME")
+            jumps.append((len(program), name, lineno))
+            program.append([OP_GOTO, name])
+        elif op == "end":
+            program.append([OP_END])
+        else:
+            raise _error(f"Unknown statement `{op}`.")
+
+    # Resolve labels to instruction indices.
+    for i, name, lineno in jumps:
+        if name not in labels:
+            raise ScriptError(f"Unknown label `{name}`.", filename, lineno)
+        program[i][-1] = labels[name]
+
+    return tuple(map(tuple, program))
+
+
+def load_script(path: Union[str, Path], cache_dir: Path = CACHE_DIR):
+    """Load & compile script at `path`, using the cached compiled form if any.
+
+    Args:
+        path (Union[str, Path]): Path to script.
+        cache_dir (Path, optional): Cache folder. Defaults to `CACHE_DIR`.
+
+    Returns:
+        Program: Compiled script.
+    """
+    source = Path(path).read_bytes()
+    digest = hashlib.sha256(source).hexdigest()[:32]
+    cache_fp = Path(cache_dir) / "scripts" / f"{digest}.bin"
+
+    try:
+        version, program = marshal.loads(cache_fp.read_bytes())
+        if version == FORMAT_VERSION:
+            return program
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+
+    program = compile_script(source.decode("utf-8"), str(path))
+    try:
+        cache_fp.parent.mkdir(parents=True, exist_ok=True)
+        tmp_fp = cache_fp.with_suffix(f".{os.getpid()}.tmp")
+        tmp_fp.write_bytes(marshal.dumps((FORMAT_VERSION, program)))
+        os.replace(tmp_fp, cache_fp)
+    except OSError as e:
+        log.warning(f"Failed to cache compiled script {path}: {e}")
+    return program
+
+
+def _format(text: str, flags: Dict[str, Any]):
+    """Substitute `{FLAG}` in `text`, leaving unknown flags as is."""
+    if "{" not in text:
+        return text
+    return FLAG_RE.sub(lambda m: str(flags.get(m[1], m[0])), text)
+
+
+def program_digest(program: Program):
+    """Hash of compiled `program`, to check saves belong to it."""
+    # NOTE: `marshal` output depends on reference counts, `repr()` doesn't.
+    return hashlib.sha256(repr(program).encode("utf-8")).hexdigest()[:32]
+
+
+class Checkpoint(NamedTuple):
+    """Interpreter state just before a prompt, for rollback."""
+
+    ip: int
+    """Index of the prompt instruction."""
+    view: Tuple[str, str, Optional[str], Optional[str]]
+    """(Speaker name, speaker side, face, background) shown at the prompt."""
+    undo: List[Tuple[str, Any]]
+    """(Flag, previous value) of flags changed after this checkpoint, in order.
+    Previous value is `UNSET` if the flag didn't exist."""
+
+
+UNSET = "\0unset"
+"""Previous value of flags that didn't exist, as saves must be JSON."""
+
+
+class Interpreter:
+    """Runs a compiled `Program` over a `Controller`.
+
+    Besides the instruction pointer, only flags & the speaker, face and background
+    shown make up the state, so it can be saved & restored without replaying the
+    story. A `Checkpoint` is pushed before every prompt, which only records flags
+    changed since, so `rollback()` costs only as much as the changes it undoes.
+    Saves keep only the latest `save_history` checkpoints, so they stay the same
+    size however long the session.
+    """
+
+    def __init__(
+        self,
+        G: Controller,
+        program: Program,
+        autosave: Optional[Union[str, Path]] = None,
+        undo_reply: Optional[str] = None,
+        save_history: int = 20,
+    ):
+        """Create interpreter at the start of `program`.
+
+        Args:
+            G (Controller): Controller to run over.
+            program (Program): Compiled script.
+            autosave (Optional[Union[str, Path]], optional): File to save to before
+                every prompt. Defaults to None.
+            undo_reply (Optional[str], optional): Reply to a prompt that rolls back
+                to the previous prompt instead. Defaults to None.
+            save_history (int, optional): Most checkpoints kept in saves, i.e. how
+                many prompts can be rolled back after resuming. Defaults to 20.
+        """
+        self.G = G
+        self.program = program
+        self.digest = program_digest(program)
+        self.autosave = autosave
+        self.undo_reply = undo_reply
+        self.save_history = save_history
+        self.ip = 0
+        """Index of next instruction."""
+        self.view: Tuple[str, str, Optional[str], Optional[str]]
+        self.view = ("", "center", None, None)
+        """(Speaker name, speaker side, face, background) currently shown."""
+        self.history: List[Checkpoint] = []
+        """Checkpoints of prompts so far, oldest first."""
+
+    @property
+    def done(self):
+        """Whether script has ended."""
+        return self.ip >= len(self.program)
+
+    def _set_flag(self, flag: str, value: Any):
+        """Set flag, recording previous value in latest checkpoint."""
+        flags = self.G.flags_dict
+        if self.history:
+            self.history[-1].undo.append((flag, flags.get(flag, UNSET)))
+        flags[flag] = value
+
+    def _show(self, view: Tuple[str, str, Optional[str], Optional[str]]):
+        """Show `view` on `G`."""
+        name, side, face, bg = view
+        self.G.set_speaker(name, side)
+        if face is not None:
+            self.G.show_face(face)
+        if bg is not None:
+            self.G.show_bg(bg)
+        self.view = view
+
+    def step(self):
+        """Execute one instruction."""
+        G, flags = self.G, self.G.flags_dict
+        op, *args = self.program[self.ip]
+        if op == OP_PROMPT:
+            # Save before pushing checkpoint, as resuming will push it again.
+            if self.autosave is not None:
+                self.save(self.autosave)
+            self.history.append(Checkpoint(self.ip, self.view, []))
+        self.ip += 1
+
+        if op == OP_SPEAKER:
+            G.set_speaker(_format(args[0], flags), args[1])
+            self.view = (_format(args[0], flags), args[1], *self.view[2:])
+        elif op == OP_PRINT:
+            G.print(_format(args[0], flags))
+        elif op == OP_PROMPT:
+            flag, text, yesno = args
+            text = _format(text, flags)
+            reply = G.input(text)
+            while yesno and reply != self.undo_reply:
+                if reply.lower()[:1] in ("y", "n"):
+                    break
+                reply = G.input(text)
+            if reply == self.undo_reply:
+                self.rollback(2 if len(self.history) > 1 else 1)
+                return
+            self._set_flag(flag, reply.lower()[:1] == "y" if yesno else reply)
+        elif op == OP_BRANCH:
+            flag, negate, target = args
+            if bool(flags.get(flag)) != negate:
+                self.ip = target
+        elif op == OP_GOTO:
+            self.ip = args[0]
+        elif op == OP_FACE:
+            G.show_face(args[0])
+            self.view = (*self.view[:2], args[0], self.view[3])
+        elif op == OP_BG:
+            G.show_bg(args[0])
+            self.view = (*self.view[:3], args[0])
+        elif op == OP_SET:
+            self._set_flag(args[0], args[1])
+        elif op == OP_END:
+            self.ip = len(self.program)
+
+    def run(self):
+        """Execute instructions until script ends."""
+        while not self.done:
+            self.step()
+
+    def rollback(self, steps: int = 1):
+        """Roll back to the `steps`-th latest prompt, which is asked again next.
+
+        Args:
+            steps (int, optional): Number of prompts to go back, where 1 is the
+                latest prompt. Defaults to 1.
+
+        Raises:
+            IndexError: If there are fewer than `steps` prompts in the history.
+        """
+        if not 0 < steps <= len(self.history):
+            raise IndexError(f"Can't roll back {steps} of {len(self.history)}.")
+        flags = self.G.flags_dict
+        for _ in range(steps):
+            checkpoint = self.history.pop()
+            for flag, value in reversed(checkpoint.undo):
+                if value == UNSET:
+                    flags.pop(flag, None)
+                else:
+                    flags[flag] = value
+        self.ip = checkpoint.ip
+        self._show(checkpoint.view)
+
+    def snapshot(self):
+        """Get JSON-serializable snapshot of the interpreter state.
+
+        Only the latest `save_history` checkpoints are included.
+        """
+        return {
+            "version": SAVE_VERSION,
+            "script": self.digest,
+            "ip": self.ip,
+            "flags": self.G.flags_dict,
+            "view": self.view,
+            "history": self.history[max(len(self.history) - self.save_history, 0) :],
+        }
+
+    def restore(self, state: Dict[str, Any]):
+        """Restore state from `snapshot()`, without replaying the story.
+
+        Raises:
+            ValueError: If `state` is from a different script or format.
+        """
+        if state.get("version") != SAVE_VERSION or state["script"] != self.digest:
+            raise ValueError("Save is from a different script.")
+        self.ip = state["ip"]
+        self.G.flags_dict.clear()
+        self.G.flags_dict.update(state["flags"])
+        self.history = [
+            Checkpoint(ip, tuple(view), [tuple(u) for u in undo])  # type: ignore
+            for ip, view, undo in state["history"]
+        ]
+        self._show(tuple(state["view"]))  # type: ignore[arg-type]
+
+    def save(self, path: Union[str, Path]):
+        """Save `snapshot()` to `path`, atomically."""
+        path = Path(path)
+        tmp_fp = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_fp, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, separators=(",", ":"))
+        os.replace(tmp_fp, path)
+
+    def load(self, path: Union[str, Path]):
+        """Restore state saved by `save()` to `path`."""
+        with open(path, encoding="utf-8") as f:
+            self.restore(json.load(f))
+
+
+def run_script(G: Controller, program: Program, **kwargs):
+    """Run compiled `program` to the end.
+
+    Keyword arguments are passed to `Interpreter`.
+    """
+    Interpreter(G, program, **kwargs).run()
@@ -0,0 +1,188 @@
+"""Incremental full-text index of chat messages."""
+
+import re
+from array import array
+from bisect import bisect_right
+from typing import Dict, Iterator, List, Optional, Sequence
+
+__all__ = ["SearchIndex", "tokenize"]
+
+WORD_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str):
+    """Split `text` into lowercase words."""
+    return WORD_RE.findall(text.lower())
+
+
+# Set bit positions of each byte value.
+_BYTE_BITS = [tuple(b for b in range(8) if v >> b & 1) for v in range(256)]
+
+
+def _bits(bitmap: bytes):
+    """Get indices of set bits in little-endian `bitmap`, in order."""
+    return [8 * k + b for k, v in enumerate(bitmap) if v for b in _BYTE_BITS[v]]
+
+
+class _BitmapMatches(Sequence[int]):
+    """Indices of set bits in a bitmap, only found when looked up.
+
+    The length is one popcount. Indexing counts bits per block of `BLOCK` bytes the
+    first time, then only expands the block holding the wanted bit, so showing one
+    result of a query matching most messages doesn't build a list of all of them.
+    """
+
+    BLOCK = 64
+    """Bytes of bitmap per block."""
+
+    def __init__(self, bitmap: bytes):
+        """Create matches of little-endian `bitmap`."""
+        self._bitmap = bitmap
+        self._len = int.from_bytes(bitmap, "little").bit_count()
+        self._counts: Optional[List[int]] = None
+        """Number of set bits before each block."""
+
+    def __len__(self):
+        """Number of matches."""
+        return self._len
+
+    def __getitem__(self, k):
+        """Get `k`-th match."""
+        if isinstance(k, slice):
+            return [self[i] for i in range(*k.indices(self._len))]
+        if k < 0:
+            k += self._len
+        if not 0 <= k < self._len:
+            raise IndexError("Match index out of range.")
+        bitmap, size = self._bitmap, self.BLOCK
+        if self._counts is None:
+            self._counts = []
+            total = 0
+            for start in range(0, len(bitmap), size):
+                self._counts.append(total)
+                block = bitmap[start : start + size]
+                total += int.from_bytes(block, "little").bit_count()
+        i = bisect_right(self._counts, k) - 1
+        start = i * size
+        return 8 * start + _bits(bitmap[start : start + size])[k - self._counts[i]]
+
+    def __iter__(self) -> Iterator[int]:
+        """Iterate matches in order."""
+        size = self.BLOCK
+        for start in range(0, len(self._bitmap), size):
+            for b in _bits(self._bitmap[start : start + size]):
+                yield 8 * start + b
+
+
+class SearchIndex:
+    """Inverted index from words to the messages containing them.
+
+    Messages must be added in increasing index order. Rare words keep a sorted
+    `array` of the messages containing them. Words found in over 1/32 of messages
+    switch to a bitmap instead, which is then no bigger than the array would be.
+    Queries intersect the arrays as sets, then check each candidate against the
+    bitmaps, or AND the bitmaps as Python ints if every word is common, in which
+    case matches are only listed as they are looked up.
+    """
+
+    DENSITY = 32
+    """Words in over 1 in `DENSITY` messages are stored as bitmaps."""
+
+    def __init__(self):
+        """Create empty index."""
+        self._n = 0
+        """Number of messages indexed."""
+        self._postings: Dict[str, array] = {}
+        self._bitmaps: Dict[str, bytearray] = {}
+
+    def add(self, i: int, text: str):
+        """Index message `i` with `text`."""
+        self._n = i + 1
+        byte, bit = i >> 3, 1 << (i & 7)
+        for word in set(tokenize(text)):
+            bitmap = self._bitmaps.get(word)
+            if bitmap is not None:
+                if len(bitmap) <= byte:
+                    bitmap.extend(bytes(byte + 1 - len(bitmap)))
+                bitmap[byte] |= bit
+                continue
+
+            postings = self._postings.get(word)
+            if postings is None:
+                postings = self._postings[word] = array("I")
+            postings.append(i)
+            if self.DENSITY * len(postings) > max(self._n, 8 * self.DENSITY):
+                bitmap = self._bitmaps[word] = bytearray(byte + 1)
+                for j in postings:
+                    bitmap[j >> 3] |= 1 << (j & 7)
+                del self._postings[word]
+
+    def search(self, query: str) -> Sequence[int]:
+        """Get indices of messages containing every word in `query`, in order."""
+        words = set(tokenize(query))
+        sparse = []
+        dense = []
+        for word in words:
+            if word in self._bitmaps:
+                dense.append(self._bitmaps[word])
+            elif word in self._postings:
+                sparse.append(self._postings[word])
+            else:
+                return []
+        if not words:
+            return []
+
+        if not sparse:
+            if len(dense) == 1:
+                return _BitmapMatches(bytes(dense[0]))
+            bits = -1
+            for bitmap in dense:
+                bits &= int.from_bytes(bitmap, "little")
+            return _BitmapMatches(bits.to_bytes((bits.bit_length() + 7) // 8, "little"))
+
+        sparse.sort(key=len)
+        if len(sparse) == 1:
+            candidates = sparse[0].tolist()
+        else:
+            common = set(sparse[0])
+            for postings in sparse[1:]:
+                common.intersection_update(postings)
+            candidates = sorted(common)
+        for bitmap in dense:
+            n = len(bitmap)
+            candidates = [
+                i for i in candidates if i >> 3 < n and bitmap[i >> 3] >> (i & 7) & 1
+            ]
+        return candidates
+
+
+# Time first & repeated queries over a large log.
+if __name__ == "__main__":
+    import random
+    import time
+
+    from .utils import LORUM
+
+    N = 50_000
+    rng = random.Random(0)
+    words = LORUM.split()
+    index = SearchIndex()
+    start = time.perf_counter()
+    for i in range(N):
+        index.add(i, f"Speaker {i % 7}:\n{' '.join(rng.choices(words, k=12))} {i}")
+    dt = (time.perf_counter() - start) / N * 1e6
+    print(f"Indexed {N} messages: {dt:.1f} us/message")
+
+    for query in ("lorem", "lorem ipsum", "speaker 3 lorem", "12345", "nothing"):
+        start = time.perf_counter()
+        results = index.search(query)
+        cold = (time.perf_counter() - start) * 1e3
+        start = time.perf_counter()
+        runs = 100
+        for _ in range(runs):
+            results = index.search(query)
+            # Jump to the newest & oldest match, like the chat log search bar.
+            if results:
+                results[-1], results[0]
+        dt = (time.perf_counter() - start) / runs * 1e3
+        print(f"{query!r:>18}: {len(results):5} results, {cold:.3f}/{dt:.3f} ms")
@@ -0,0 +1,152 @@
+"""Persistent index of lines already seen in earlier playthroughs."""
+
+import hashlib
+import logging
+import os
+import sys
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import BinaryIO, Optional, Set, Union
+
+from .utils import DATA_DIR
+
+__all__ = ["SeenIndex", "line_key"]
+
+log = logging.getLogger(__name__)
+
+
+def line_key(speaker: str, text: str):
+    """Stable 64-bit hash of a line, the same across runs & machines."""
+    data = f"{speaker}\0{text}".encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+class SeenIndex:
+    """Set of seen lines, stored on disk as packed 64-bit hashes.
+
+    Hashes loaded from disk are kept in a sorted `array` (8 bytes each) and looked
+    up by bisection. Lines seen in this run go in a small set, and are appended to
+    the file as they are seen, so progress survives crashes. Duplicates from
+    concurrent runs are dropped the next time the index is loaded.
+    """
+
+    def __init__(self, path: Union[str, Path, None] = DATA_DIR / "seen.bin"):
+        """Load index.
+
+        Args:
+            path (Union[str, Path, None], optional): Index file, created if missing.
+                Defaults to "seen.bin" in `DATA_DIR`. None to not persist.
+        """
+        self.path = None if path is None else Path(path)
+        self._sorted = array("Q")
+        self._recent: Set[int] = set()
+        self._file: Optional[BinaryIO] = None
+        if self.path is not None:
+            self._load()
+
+    def _load(self):
+        """Read index file, compacting it if it has duplicates."""
+        assert self.path is not None
+        try:
+            data = self.path.read_bytes()
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            log.warning(f"Failed to read seen index {self.path}: {e}")
+            return
+        keys = array("Q")
+        keys.frombytes(data[: len(data) // 8 * 8])
+        # Keys are stored little-endian, see `add()`.
+        if sys.byteorder != "little":
+            keys.byteswap()
+        unique = sorted(set(keys))
+        self._sorted = array("Q", unique)
+        if len(unique) != len(keys):
+            self._rewrite()
+
+    def _rewrite(self):
+        """Replace index file with the deduplicated keys."""
+        assert self.path is not None
+        try:
+            tmp_fp = self.path.with_suffix(f".{os.getpid()}.tmp")
+            keys = array("Q", self._sorted)
+            if sys.byteorder != "little":
+                keys.byteswap()
+            tmp_fp.write_bytes(keys.tobytes())
+            os.replace(tmp_fp, self.path)
+        except OSError as e:
+            log.warning(f"Failed to compact seen index {self.path}: {e}")
+
+    def __len__(self):
+        """Number of lines seen."""
+        return len(self._sorted) + len(self._recent)
+
+    def __contains__(self, key: int):
+        """Whether line with `key` from `line_key()` was seen."""
+        if key in self._recent:
+            return True
+        i = bisect_left(self._sorted, key)
+        return i < len(self._sorted) and self._sorted[i] == key
+
+    def seen(self, speaker: str, text: str):
+        """Whether line was seen."""
+        return line_key(speaker, text) in self
+
+    def add(self, speaker: str, text: str):
+        """Mark line as seen.
+
+        Returns:
+            bool: Whether line was seen before.
+        """
+        key = line_key(speaker, text)
+        if key in self:
+            return True
+        self._recent.add(key)
+        if self.path is not None:
+            try:
+                if self._file is None:
+                    self.path.parent.mkdir(parents=True, exist_ok=True)
+                    self._file = open(self.path, "ab", buffering=0)
+                self._file.write(key.to_bytes(8, "little"))
+            except OSError as e:
+                log.warning(f"Failed to save seen index {self.path}: {e}")
+                self.path = None
+        return False
+
+    def close(self):
+        """Close index file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+# Measure lookup speed & size of a large index.
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    N = 100_000
+    lines = [(f"Speaker {i % 7}", f"Line number {i}.") for i in range(N)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fp = Path(tmp) / "seen.bin"
+        index = SeenIndex(fp)
+        for line in lines:
+            index.add(*line)
+        index.close()
+
+        start = time.perf_counter()
+        index = SeenIndex(fp)
+        load = time.perf_counter() - start
+
+        start = time.perf_counter()
+        hits = sum(index.seen(*line) for line in lines)
+        misses = sum(index.seen("", text) for _, text in lines)
+        dt = (time.perf_counter() - start) / (2 * N) * 1e6
+
+        size = fp.stat().st_size
+        mem = sys.getsizeof(index._sorted)
+        print(f"{N} lines: {size >> 10} KiB on disk, {mem >> 10} KiB in memory")
+        print(f"Load: {load * 1e3:.1f} ms, lookup: {dt:.2f} us")
+        print(f"Hits: {hits}/{N}, false hits: {misses}/{N}")
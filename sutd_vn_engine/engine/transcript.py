@@ -0,0 +1,284 @@
+"""Append-only chat transcript on disk, with a bounded window in memory."""
+
+import json
+import logging
+import shutil
+import sys
+import tempfile
+import threading
+from array import array
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Dict, Deque, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+__all__ = ["Message", "MessageStore", "Transcript", "SIDES"]
+
+log = logging.getLogger(__name__)
+
+
+class Message(NamedTuple):
+    """Data of a message, whether or not it has a widget."""
+
+    name: str
+    """Name of speaker."""
+    side: str
+    """Position of message, see `_MsgSide`."""
+    text: str
+    """Full text of message, including speaker name."""
+
+
+SIDES = ("left", "right", "center")
+"""Valid message sides, in order of their codes in `MessageStore`."""
+_SIDE_CODES = {side: i for i, side in enumerate(SIDES)}
+
+
+class MessageStore:
+    """Fixed number of message slots, stored as parallel arrays.
+
+    Speaker names are interned in a table & stored as 4-byte codes, and sides as
+    1-byte codes, so only the text of each message is a separate object.
+    """
+
+    __slots__ = (
+        "capacity",
+        "_speakers",
+        "_speaker_codes",
+        "_names",
+        "_sides",
+        "_texts",
+    )
+
+    def __init__(self, capacity: int):
+        """Create store with `capacity` empty slots."""
+        self.capacity = capacity
+        self._speakers: List[str] = []
+        self._speaker_codes: Dict[str, int] = {}
+        self._names = array("I", [0]) * capacity
+        self._sides = array("B", [0]) * capacity
+        self._texts: List[Optional[str]] = [None] * capacity
+
+    def __setitem__(self, slot: int, msg: Message):
+        """Store `msg` in `slot`."""
+        code = self._speaker_codes.get(msg.name)
+        if code is None:
+            code = self._speaker_codes[msg.name] = len(self._speakers)
+            self._speakers.append(msg.name)
+        self._names[slot] = code
+        self._sides[slot] = _SIDE_CODES[msg.side]
+        self._texts[slot] = msg.text
+
+    def __getitem__(self, slot: int):
+        """Get message in `slot`."""
+        name = self._speakers[self._names[slot]]
+        return Message(name, SIDES[self._sides[slot]], self._texts[slot] or "")
+
+
+class Transcript:
+    """Sequence of messages streamed to an append-only log on disk.
+
+    Only the latest `capacity` messages are kept in a ring buffer, and at most
+    `capacity` older ones are kept in an LRU cache after being reloaded, so memory
+    use doesn't grow with the session.
+
+    The log is a file of JSON lines, `[name, side, text]`, plus an index file of
+    little-endian uint64 offsets of each line. Messages are written by a background
+    thread every `flush_interval` seconds.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path, None] = None,
+        capacity: int = 1000,
+        flush_interval: float = 0.5,
+    ):
+        """Create empty transcript.
+
+        Args:
+            path (Union[str, Path, None], optional): Log file, overwritten. Index
+                file is the same path with ".idx" added. Defaults to None to use a
+                temporary file deleted on `close()`.
+            capacity (int, optional): Latest messages kept in memory. Defaults to
+                1000.
+            flush_interval (float, optional): Seconds between writes to disk.
+                Defaults to 0.5.
+        """
+        self._tmpdir = None
+        if path is None:
+            self._tmpdir = tempfile.mkdtemp(prefix="sutd_vn_transcript_")
+            path = Path(self._tmpdir) / "transcript.jsonl"
+        self.path = Path(path)
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+
+        self._len = 0
+        self._end = 0
+        """Offset of the end of the log, including pending writes."""
+        self._ring = MessageStore(capacity)
+        self._cache: OrderedDict[int, Message] = OrderedDict()
+
+        # (Line, offset) waiting for the writer thread.
+        self._pending: Deque[Tuple[bytes, int]] = deque()
+        self._written = 0
+        """Number of messages written to disk."""
+        self._cond = threading.Condition()
+        self._wake = threading.Event()
+        self._closing = False
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        idx_path = self.path.with_name(self.path.name + ".idx")
+        self._wlog = open(self.path, "wb")
+        self._widx = open(idx_path, "wb")
+        self._rlog = open(self.path, "rb")
+        self._ridx = open(idx_path, "rb")
+        self._writer = threading.Thread(
+            target=self._run, name="transcript-writer", daemon=True
+        )
+        self._writer.start()
+
+    def _run(self):
+        """Writer thread."""
+        while not self._closing:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self._write_pending()
+        self._write_pending()
+
+    def _write_pending(self):
+        """Write all pending messages & flush them to disk."""
+        lines = []
+        offsets = array("Q")
+        while self._pending:
+            line, offset = self._pending.popleft()
+            lines.append(line)
+            offsets.append(offset)
+        if not lines:
+            return
+        try:
+            if sys.byteorder != "little":
+                offsets.byteswap()
+            self._wlog.write(b"".join(lines))
+            self._widx.write(offsets.tobytes())
+            self._wlog.flush()
+            self._widx.flush()
+        except (OSError, ValueError) as e:
+            log.warning(f"Failed to write transcript {self.path}: {e}")
+        with self._cond:
+            self._written += len(lines)
+            self._cond.notify_all()
+
+    def append(self, msg: Message):
+        """Append message.
+
+        Returns:
+            int: Index of message.
+        """
+        i = self._len
+        line = json.dumps(msg, ensure_ascii=False, separators=(",", ":")) + "\n"
+        data = line.encode("utf-8")
+        self._pending.append((data, self._end))
+        self._end += len(data)
+        self._ring[i % self.capacity] = msg
+        self._len += 1
+        return i
+
+    def flush(self):
+        """Block till all appended messages are written to disk."""
+        target = self._len
+        self._wake.set()
+        with self._cond:
+            self._cond.wait_for(lambda: self._written >= target or self._closing)
+
+    def _load(self, i: int):
+        """Read message `i` from disk."""
+        if i >= self._written:
+            self.flush()
+        self._ridx.seek(8 * i)
+        offset = int.from_bytes(self._ridx.read(8), "little")
+        self._rlog.seek(offset)
+        return Message(*json.loads(self._rlog.readline()))
+
+    def __len__(self):
+        """Number of messages."""
+        return self._len
+
+    def __getitem__(self, i: int) -> Message:
+        """Get message `i`, reloading it from disk if it is no longer in memory."""
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError("Transcript index out of range.")
+        if i >= self._len - self.capacity:
+            return self._ring[i % self.capacity]
+
+        msg = self._cache.get(i)
+        if msg is None:
+            msg = self._cache[i] = self._load(i)
+            if len(self._cache) > self.capacity:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(i)
+        return msg
+
+    def __iter__(self) -> Iterator[Message]:
+        """Iterate over all messages, streaming older ones from disk."""
+        n = self._len
+        start = max(n - self.capacity, 0)
+        if start > 0:
+            self.flush()
+            self._rlog.seek(0)
+            for _ in range(start):
+                yield Message(*json.loads(self._rlog.readline()))
+        for i in range(start, n):
+            yield self._ring[i % self.capacity]
+
+    def close(self):
+        """Write pending messages & close files, deleting them if temporary."""
+        if self._closing:
+            return
+        self._closing = True
+        self._wake.set()
+        self._writer.join()
+        for f in (self._wlog, self._widx, self._rlog, self._ridx):
+            f.close()
+        if self._tmpdir is not None:
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+
+
+# Compare memory of message layouts & the transcript for a long session.
+if __name__ == "__main__":
+    import time
+    import tracemalloc
+
+    from .utils import LORUM
+
+    N = 100_000
+    texts = [LORUM[: 50 + i % 300] for i in range(N)]
+
+    def _measure(name: str, make, add):
+        """Add `N` messages to `make()` with `add()` & report memory & time.
+
+        Texts are shared by all layouts, so only the overhead per message counts.
+        """
+        tracemalloc.start()
+        start = time.perf_counter()
+        messages = make()
+        for i, text in enumerate(texts):
+            # Names are built per message, like `ChatLog._msg()` gets from stories.
+            add(messages, i, Message(f"Speaker {i % 7}", SIDES[i % 3], text))
+        dt = (time.perf_counter() - start) / N * 1e6
+        mem = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"{name:>10}: {mem / 2**20:5.1f} MiB, {dt:4.1f} us/message")
+        return messages
+
+    _measure("dict", list, lambda ms, i, m: ms.append(m._asdict()))
+    _measure("Message", list, lambda ms, i, m: ms.append(m))
+    _measure("store", lambda: MessageStore(N), MessageStore.__setitem__)
+    transcript = _measure("transcript", Transcript, lambda ms, i, m: ms.append(m))
+
+    start = time.perf_counter()
+    for i in range(0, N, 97):
+        transcript[i]
+    dt = (time.perf_counter() - start) / len(range(0, N, 97)) * 1e6
+    print(f"Reload from disk: {dt:.1f} us/message")
+    transcript.close()
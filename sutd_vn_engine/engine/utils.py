@@ -1,25 +1,37 @@
 """Utilities and constants."""
 
 import asyncio
+import os
 import tkinter as tk
 from pathlib import Path
 from typing import Coroutine
 
 import sutd_vn_engine.assets
+import sutd_vn_engine.scripts
 
 __all__ = [
     "LOOP_WAIT",
+    "IDLE_WAIT",
     "EM",
     "LORUM",
     "ASSETS_DIR",
+    "SCRIPTS_DIR",
+    "CACHE_DIR",
+    "DATA_DIR",
     "wait_coro",
     "bind_toggle",
     "add_bind_tag",
-    "set_canvas_bg",
 ]
 
 LOOP_WAIT = 1 / 60
 """60Hz loop sleep. Sleep is needed in asyncio to process other events."""
+IDLE_WAIT = 0.1
+"""Longest sleep of the GUI loop while Tkinter is idle, if it has to poll Tk.
+
+Only used where asyncio can't wait in Tk's event loop (see `TkSelector`). Input
+arriving while idle is then handled up to this late, for 10 wakeups/s at rest
+instead of 60.
+"""
 # NOTE: Put in a list to be mutable.
 EM = [2]  # In px.
 """Global size used for fonts, padding, and so on."""
@@ -33,6 +45,18 @@ LORUM = (
 )
 ASSETS_DIR = Path(sutd_vn_engine.assets.__path__[0]).absolute()
 """Path to `sutd_vn_engine/assets` folder."""
+SCRIPTS_DIR = Path(sutd_vn_engine.scripts.__path__[0]).absolute()
+"""Path to `sutd_vn_engine/scripts` folder."""
+CACHE_DIR = Path(
+    os.environ.get("SUTD_VN_CACHE_DIR", Path.home() / ".cache" / "sutd_vn_engine")
+)
+"""Folder for caches that are safe to delete. Set by `SUTD_VN_CACHE_DIR`."""
+DATA_DIR = Path(
+    os.environ.get(
+        "SUTD_VN_DATA_DIR", Path.home() / ".local" / "share" / "sutd_vn_engine"
+    )
+)
+"""Folder for player data kept across playthroughs. Set by `SUTD_VN_DATA_DIR`."""
 
 
 def wait_coro(coro: Coroutine, loop: asyncio.AbstractEventLoop):
@@ -102,39 +126,3 @@ def add_bind_tag(tag: str, *widgets: tk.Widget):
     """
     for widget in widgets:
         widget.bindtags((tag,) + widget.bindtags())
-
-
-all_images = []
-"""Prevent GC of images by storing them in a global list."""
-
-
-def set_canvas_bg(
-    canvas: tk.Canvas,
-    image_path: str,
-    xratio: float = 0.5,
-    yratio: float = 0.5,
-    resize: bool = True,
-    anchor: str = "center",
-):
-    """Set background image of `canvas` to `image_path`."""
-    img = tk.PhotoImage(master=canvas, file=image_path)
-    img_id = canvas.create_image(0, 0, image=img, anchor=anchor)
-
-    def _recale_bg(_):
-        """Re-scale background image to fit canvas."""
-        width, height = canvas.winfo_width(), canvas.winfo_height()
-        # NOTE: Tkinter only supports integer zooming, this hurts me.
-        if not resize:
-            new_img = img
-        elif width > img.width():
-            new_img = img.zoom(max(round(width / img.width()), 1))
-        else:
-            new_img = img.subsample(max(round(img.width() / width), 1))
-
-        # Set new background & center it.
-        canvas.itemconfig(img_id, image=new_img)
-        canvas.coords(img_id, int(width * xratio), int(height * yratio))
-        all_images.append(new_img)
-
-    _recale_bg(None)
-    canvas.bind("<Configure>", _recale_bg, "+")
@@ -20,6 +20,7 @@ def create_window(
     *,
     disable_resize: bool = False,
     enable_close: bool = False,
+    hidden: bool = False,
 ):
     """Create a windowed frame.
 
@@ -31,6 +32,9 @@ def create_window(
         bbox (Tuple[int, int, int, int]): XYWH bounding box of window.
         disable_resize (bool, optional): Whether to disable window resizing. Defaults to False.
         enable_close (bool, optional): Whether to disable window closing. Defaults to False.
+        hidden (bool, optional): Whether to create window hidden. Its canvas id is
+            stored as `win_id` on the returned frame to show it later. Defaults to
+            False.
 
     Returns:
         tk.Frame: Frame widget to put window contents in.
@@ -67,7 +71,13 @@ def create_window(
     tlabel.pack(side="left")
     tclosebtn.pack(side="right")
     tshadebtn.pack(side="right")
-    win_id = canvas.create_window((x, y), window=win, anchor="nw", tags=WIN_TAG)
+    win_id = canvas.create_window(
+        (x, y),
+        window=win,
+        anchor="nw",
+        tags=WIN_TAG,
+        state="hidden" if hidden else "normal",
+    )
 
     # Add window to id map.
     win_id_map[win_id] = win
@@ -166,4 +176,5 @@ def create_window(
     # Remove window from id map on destroy.
     win.bind("<Destroy>", lambda _: win_id_map.pop(win_id, None))
 
+    setattr(content, "win_id", win_id)
     return content
@@ -0,0 +1 @@
+"""Folder contains story scripts for the game."""
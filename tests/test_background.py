@@ -0,0 +1,60 @@
+"""Check that memory & handlers stay constant over many background changes.
+
+Drives a real `tk.Canvas`, so it is skipped when there is no display.
+"""
+
+import tkinter as tk
+import tracemalloc
+
+import pytest
+
+from sutd_vn_engine.engine.background import (
+    BackgroundLayer,
+    get_bg_layers,
+    set_canvas_bg,
+)
+from sutd_vn_engine.engine.image import ImageCache
+from sutd_vn_engine.engine.utils import ASSETS_DIR
+
+CALLS = 300
+
+
+@pytest.fixture
+def canvas():
+    """Laid out 1280x720 canvas in a new Tk app."""
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        pytest.skip(f"No display: {e}")
+    canvas = tk.Canvas(root, width=1280, height=720)
+    canvas.pack()
+    root.update()
+    yield canvas
+    root.destroy()
+
+
+def test_background_changes_reuse_layer(canvas: tk.Canvas):
+    """Changing backgrounds reuses one canvas item, handler & bounded cache."""
+    fps = sorted(ASSETS_DIR.glob("face_*.png"))[:3] + [ASSETS_DIR / "background.png"]
+    cache = ImageCache()
+    layers = get_bg_layers(canvas)
+    layers["story"] = BackgroundLayer(canvas, cache=cache)
+    images = len(canvas.tk.call("image", "names"))
+
+    tracemalloc.start()
+    try:
+        for i in range(CALLS):
+            if i == len(fps):
+                warm = tracemalloc.get_traced_memory()[0]
+            set_canvas_bg(canvas, str(fps[i % len(fps)]), layer="story")
+            canvas.update()
+        growth = tracemalloc.get_traced_memory()[0] - warm
+    finally:
+        tracemalloc.stop()
+
+    assert len(canvas.find_all()) == 1
+    handlers = canvas.bind("<Configure>").strip().splitlines()
+    assert len([line for line in handlers if line.strip()]) == 1
+    assert len(cache._images) <= len(fps) and cache.size <= cache.budget
+    assert len(canvas.tk.call("image", "names")) - images <= len(fps)
+    assert growth < 64 * 1024, "Memory grew with background changes."
@@ -0,0 +1,86 @@
+"""Check that a pending `input()` doesn't wake the GUI loop.
+
+Uses stand-in widgets on a bare Tcl interpreter, so no display is needed.
+"""
+
+import asyncio
+import tkinter as tk
+from math import ceil, log2
+from typing import Callable, Dict
+
+from sutd_vn_engine.engine.app import create_input_function
+from sutd_vn_engine.engine.pump import get_pump, new_event_loop
+from sutd_vn_engine.engine.utils import IDLE_WAIT, LOOP_WAIT
+
+PENDING_SECS = 1.0
+
+
+class _Widget:
+    """Stand-in for the chat log & input box used by `_input()`."""
+
+    def __init__(self, interp: tk.Tcl):
+        """Create widget of `interp`."""
+        self.tk = interp.tk
+        self.text = ""
+        self.bindings: Dict[str, Callable] = {}
+
+    def config(self, **_):
+        """Ignore config."""
+
+    def bind(self, sequence: str, func: Callable):
+        """Store binding."""
+        self.bindings[sequence] = func
+
+    def get(self):
+        """Get entered text."""
+        return self.text
+
+    def delete(self, *_):
+        """Clear entered text."""
+        self.text = ""
+
+    def insert(self, _, text: str):
+        """Enter text."""
+        self.text += text
+
+    def add_msg(self, *_, **__):
+        """Ignore message."""
+
+
+async def _pending_wakeups():
+    """Leave a prompt pending & count wakeups, then submit replies."""
+    box = _Widget(tk.Tcl())
+    _input, _enter = create_input_function(box, box)  # type: ignore[arg-type]
+    pump = get_pump(box)  # type: ignore[arg-type]
+    assert (pump.min_wait, pump.max_wait) == (LOOP_WAIT, IDLE_WAIT)
+    pump_task = asyncio.create_task(pump.run())
+    input_task = asyncio.create_task(_input("What is your name?"))
+    await asyncio.sleep(PENDING_SECS)
+    wakeups = pump.wakeups
+
+    box.text = "Alice"
+    box.bindings["<Return>"](None)
+    assert await input_task == "Alice"
+
+    # Replies typed by code are entered once the prompt is shown & they are due.
+    _enter("Bob", 0.2)
+    start = asyncio.get_running_loop().time()
+    assert await _input("And your friend?") == "Bob"
+    assert asyncio.get_running_loop().time() - start >= 0.2
+    pump.stop()
+    await pump_task
+    return wakeups
+
+
+def test_pending_input_waits_in_tk():
+    """On the app's event loop, the pump only wakes when asked to."""
+    with asyncio.Runner(loop_factory=new_event_loop) as runner:
+        wakeups = runner.run(_pending_wakeups())
+    assert wakeups <= 3, "Pending input woke the GUI loop."
+
+
+def test_pending_input_polls_slowly():
+    """Elsewhere, idle waits double from `LOOP_WAIT` up to `IDLE_WAIT`."""
+    wakeups = asyncio.run(_pending_wakeups())
+    bound = ceil(log2(IDLE_WAIT / LOOP_WAIT)) + PENDING_SECS / IDLE_WAIT + 2
+    assert wakeups <= bound, "Pending input woke the GUI loop."